@@ -0,0 +1,94 @@
+"""
+bench_startup.py — Cold-start budget for the lookup-only path.
+
+Starts fresh interpreters that import enrichment and call lookup_ip once,
+and compares their median wall time with a bare interpreter. The
+difference must stay within BUDGET_MS, and no enrichment provider (API
+client or fake) may be imported on that path. Runs against a throwaway
+database initialised before timing starts; db/ is not touched.
+
+Usage:
+    python app/bench_startup.py [--runs N] [--budget-ms MS]
+"""
+
+import argparse
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+SCHEMA_PATH = APP_DIR.parent / "db" / "schema.sql"
+BUDGET_MS = 30.0
+
+INIT_SNIPPET = f"""
+import sys
+sys.path.insert(0, {str(APP_DIR)!r})
+import storage
+storage.init_db()
+"""
+
+LOOKUP_SNIPPET = f"""
+import sys
+sys.path.insert(0, {str(APP_DIR)!r})
+import enrichment
+enrichment.lookup_ip("192.0.2.1")
+loaded = [m for m in ("fake_providers", "virustotal_client", "ipinfo_client",
+                      "abuseipdb_client", "importlib.metadata") if m in sys.modules]
+if loaded:
+    sys.exit("eagerly imported: " + ", ".join(loaded))
+"""
+
+
+def _time_run(code: str, cwd: Path) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=cwd)
+    return (time.perf_counter() - started) * 1000
+
+
+def measure(runs: int) -> tuple[float, float]:
+    """Median milliseconds for (bare interpreter, lookup-only path)."""
+    with tempfile.TemporaryDirectory(prefix="bench_startup_") as tmp:
+        workdir = Path(tmp)
+        (workdir / "db").mkdir()
+        shutil.copy(SCHEMA_PATH, workdir / "db" / "schema.sql")
+        subprocess.run([sys.executable, "-c", INIT_SNIPPET], check=True, cwd=workdir)
+
+        # Warm the OS file cache so we time Python, not the disk
+        _time_run("pass", workdir)
+        _time_run(LOOKUP_SNIPPET, workdir)
+
+        bare = statistics.median(_time_run("pass", workdir) for _ in range(runs))
+        lookup = statistics.median(_time_run(LOOKUP_SNIPPET, workdir) for _ in range(runs))
+    return bare, lookup
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure cold start of the lookup-only path.")
+    parser.add_argument("--runs", type=int, default=15, help="interpreter launches per measurement (default: 15)")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS,
+                        help=f"allowed cost over a bare interpreter (default: {BUDGET_MS:.0f} ms)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    try:
+        bare, lookup = measure(args.runs)
+    except subprocess.CalledProcessError:
+        print("❌ Lookup-only path failed or imported a provider eagerly")
+        sys.exit(1)
+
+    overhead = lookup - bare
+    print(f"Bare interpreter:   {bare:7.1f} ms")
+    print(f"import + lookup_ip: {lookup:7.1f} ms")
+    print(f"Overhead:           {overhead:7.1f} ms  (budget {args.budget_ms:.0f} ms)")
+
+    if overhead > args.budget_ms:
+        print("❌ Over budget")
+        sys.exit(1)
+    print("✅ Within budget")
@@ -8,6 +8,8 @@ import io
 import sqlite3
 from pathlib import Path
 
+from storage import decode_ip
+
 # Fix Windows console encoding for emoji/unicode
 if sys.platform == "win32":
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
@@ -15,6 +17,23 @@ if sys.platform == "win32":
 DB_PATH = Path("db/raw_iocs.db")
 
 
+def _count(cursor, ioc_type: str, table: str) -> int:
+    """
+    Read a total from the trigger-maintained ioc_counters table.
+    Falls back to a COUNT(*) scan on databases created before the counters existed.
+    """
+    try:
+        cursor.execute("SELECT total FROM ioc_counters WHERE ioc_type = ?", (ioc_type,))
+        row = cursor.fetchone()
+        if row:
+            return row[0]
+    except sqlite3.OperationalError:
+        pass
+
+    cursor.execute(f"SELECT COUNT(*) FROM {table}")
+    return cursor.fetchone()[0]
+
+
 def check():
     if not DB_PATH.exists():
         print(f"❌ Database not found at {DB_PATH}")
@@ -28,16 +47,15 @@ def check():
     print("  IP IOCs TABLE")
     print("=" * 50)
     try:
-        cursor.execute("SELECT COUNT(*) FROM ip_iocs")
-        count = cursor.fetchone()[0]
+        count = _count(cursor, "ip", "ip_iocs")
         print(f"  Total: {count}")
 
-        cursor.execute("SELECT id, ip_address, first_seen FROM ip_iocs LIMIT 10")
+        cursor.execute("SELECT id, ip_key, first_seen FROM ip_iocs LIMIT 10")
         rows = cursor.fetchall()
         if rows:
             print(f"  Showing first {len(rows)}:")
             for row in rows:
-                print(f"    [{row[0]}] {row[1]}  (seen: {row[2]})")
+                print(f"    [{row[0]}] {decode_ip(row[1])}  (seen: {row[2]})")
         else:
             print("  (empty)")
     except sqlite3.OperationalError:
@@ -49,13 +67,11 @@ def check():
     print("  DOMAIN / URL IOCs TABLE")
     print("=" * 50)
     try:
-        cursor.execute("SELECT COUNT(*) FROM domain_iocs WHERE ioc_type = 'domain'")
-        domain_count = cursor.fetchone()[0]
-        cursor.execute("SELECT COUNT(*) FROM domain_iocs WHERE ioc_type = 'url'")
-        url_count = cursor.fetchone()[0]
+        domain_count = _count(cursor, "domain", "domain_iocs")
+        url_count = _count(cursor, "url", "url_iocs")
         print(f"  Domains: {domain_count}  |  URLs: {url_count}")
 
-        cursor.execute("SELECT id, domain_or_url, ioc_type, first_seen FROM domain_iocs LIMIT 10")
+        cursor.execute("SELECT id, domain_or_url, ioc_type, first_seen FROM domain_url_iocs LIMIT 10")
         rows = cursor.fetchall()
         if rows:
             print(f"  Showing first {len(rows)}:")
@@ -64,7 +80,7 @@ def check():
         else:
             print("  (empty)")
     except sqlite3.OperationalError:
-        print("  ⚠️  Table 'domain_iocs' does not exist yet.")
+        print("  ⚠️  Tables 'domain_iocs' / 'url_iocs' do not exist yet.")
 
     # ------ Enrichment Results ------
     print()
@@ -72,8 +88,7 @@ def check():
     print("  ENRICHMENT CACHE")
     print("=" * 50)
     try:
-        cursor.execute("SELECT COUNT(*) FROM enrichment_results")
-        count = cursor.fetchone()[0]
+        count = _count(cursor, "enrichment", "enrichment_results")
         print(f"  Total cached results: {count}")
 
         cursor.execute(
@@ -116,6 +131,21 @@ def check():
         print(f"  Records: {count}")
         print(f"  Run 'python app/migrate.py' to migrate data to the new tables.")
 
+    # ------ Pre-compact tables still being backfilled ------
+    for legacy in ("ip_iocs_legacy", "domain_iocs_legacy"):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (legacy,))
+        if cursor.fetchone():
+            print()
+            print(f"  ⚠️  '{legacy}' still holds rows from the old text layout.")
+            print(f"  Run 'python app/migrate.py --compact' to finish moving them.")
+
+    # ------ Sharded mode ------
+    manifest = DB_PATH.parent / "shards" / "manifest.json"
+    if manifest.exists():
+        print()
+        print(f"  ℹ️  Sharded mode is on ({manifest}); the counts above cover the main DB only.")
+        print(f"  Run 'python app/stats.py' for totals across all shards.")
+
     conn.close()
 
 
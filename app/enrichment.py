@@ -1,9 +1,10 @@
 """
 enrichment.py — Bridge between the data pipeline DB and the API scanner.
 
-Reads IOCs from the DB, calls VirusTotal / IPInfo / AbuseIPDB,
-caches results in the enrichment_results table, and returns
-combined JSON-ready dicts for the frontend.
+Reads IOCs from the DB, calls VirusTotal / IPInfo / AbuseIPDB through
+the provider registry (providers.py), caches results in the
+enrichment_results table, and returns combined JSON-ready dicts for the
+frontend.
 
 Usage:
     from enrichment import enrich_ip, enrich_domain
@@ -12,19 +13,10 @@ Usage:
     result = enrich_domain("example.com") # returns combined dict
 """
 
-import sys
-import os
 import json
 
-# Add the Malicious-Check project to the path so we can import its API clients
-SCANNER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "Zeronsec", "Gunjan_Repo", "Malicious-Check"))
-if SCANNER_DIR not in sys.path:
-    sys.path.insert(0, SCANNER_DIR)
-
-# --- Import API clients from the scanner project ---
-import virustotal_client
-import ipinfo_client
-import abuseipdb_client
+# --- API providers are imported lazily, on first enrichment call ---
+from providers import get_provider
 
 # --- Import local storage functions ---
 from storage import (
@@ -35,6 +27,9 @@ from storage import (
 )
 
 
+IP_PROVIDERS = ("virustotal", "ipinfo", "abuseipdb")
+
+
 # ==================== IP ENRICHMENT ====================
 
 def enrich_ip(ip_address: str) -> dict:
@@ -61,40 +56,27 @@ def enrich_ip(ip_address: str) -> dict:
         result["in_threat_feed"] = True
         result["first_seen"] = db_match.get("first_seen")
 
-    # 2 & 3. Fetch from cache or call APIs
-
-    # --- VirusTotal ---
-    vt_data = get_cached_enrichment(ip_address, "virustotal")
-    if not vt_data:
-        vt_data = virustotal_client.search_ip(ip_address)
-        if vt_data:
-            # Also grab relationships
-            resolutions = virustotal_client.get_ip_resolutions(ip_address)
-            comm_files = virustotal_client.get_ip_communicating_files(ip_address)
-            vt_data["resolutions"] = resolutions or []
-            vt_data["communicating_files"] = comm_files or []
-            cache_enrichment(ip_address, "ip", "virustotal", json.dumps(vt_data, default=str))
-    result["virustotal"] = vt_data
-
-    # --- IPInfo ---
-    ipinfo_data = get_cached_enrichment(ip_address, "ipinfo")
-    if not ipinfo_data:
-        ipinfo_data = ipinfo_client.search_ip(ip_address)
-        if ipinfo_data:
-            cache_enrichment(ip_address, "ip", "ipinfo", json.dumps(ipinfo_data, default=str))
-    result["ipinfo"] = ipinfo_data
-
-    # --- AbuseIPDB ---
-    abuse_data = get_cached_enrichment(ip_address, "abuseipdb")
-    if not abuse_data:
-        abuse_data = abuseipdb_client.search_ip(ip_address)
-        if abuse_data:
-            cache_enrichment(ip_address, "ip", "abuseipdb", json.dumps(abuse_data, default=str))
-    result["abuseipdb"] = abuse_data
+    # 2 & 3. Fetch from cache or call APIs (VirusTotal → IPInfo → AbuseIPDB)
+    for api_source in IP_PROVIDERS:
+        result[api_source] = _cached_or_fetch(ip_address, "ip", api_source)
 
     return result
 
 
+def _cached_or_fetch(ioc_value: str, ioc_type: str, api_source: str) -> dict | None:
+    """Return the cached result for (ioc_value, api_source), calling the provider on a miss."""
+    data = get_cached_enrichment(ioc_value, api_source)
+    if not data:
+        provider = get_provider(api_source)
+        if ioc_type == "ip":
+            data = provider.search_ip(ioc_value)
+        else:
+            data = provider.search_domain(ioc_value)
+        if data:
+            cache_enrichment(ioc_value, ioc_type, api_source, json.dumps(data, default=str))
+    return data
+
+
 # ==================== DOMAIN ENRICHMENT ====================
 
 def enrich_domain(domain: str) -> dict:
@@ -121,27 +103,16 @@ def enrich_domain(domain: str) -> dict:
         result["first_seen"] = db_match.get("first_seen")
 
     # 2 & 3. Fetch from cache or call VT
-
-    # --- VirusTotal Domain ---
-    vt_data = get_cached_enrichment(domain, "virustotal")
-    if not vt_data:
-        vt_data = virustotal_client.search_domain(domain)
-        if vt_data:
-            # Also grab subdomains and communicating files
-            vt_subs = virustotal_client.get_domain_subdomains(domain)
-            comm_files = virustotal_client.get_domain_communicating_files(domain)
-            vt_data["subdomains"] = vt_subs or []
-            vt_data["communicating_files"] = comm_files or []
-            cache_enrichment(domain, "domain", "virustotal", json.dumps(vt_data, default=str))
-    result["virustotal"] = vt_data
+    result["virustotal"] = _cached_or_fetch(domain, "domain", "virustotal")
 
     # --- Extract resolved IPs from VT ---
     resolved_ips = set()
 
     # From VT resolutions
-    vt_resolutions = virustotal_client.get_domain_resolutions(domain)
+    vt_resolutions = get_provider("virustotal").domain_resolutions(domain)
     if vt_resolutions:
-        result["virustotal"]["resolutions"] = vt_resolutions
+        if result["virustotal"] is not None:
+            result["virustotal"]["resolutions"] = vt_resolutions
         for res in vt_resolutions:
             ip = res.get("ip_address")
             if ip:
@@ -153,23 +124,8 @@ def enrich_domain(domain: str) -> dict:
 
     for ip in cascade_ips:
         ip_entry = {"ip": ip, "ipinfo": None, "abuseipdb": None}
-
-        # IPInfo
-        ipinfo_data = get_cached_enrichment(ip, "ipinfo")
-        if not ipinfo_data:
-            ipinfo_data = ipinfo_client.search_ip(ip)
-            if ipinfo_data:
-                cache_enrichment(ip, "ip", "ipinfo", json.dumps(ipinfo_data, default=str))
-        ip_entry["ipinfo"] = ipinfo_data
-
-        # AbuseIPDB
-        abuse_data = get_cached_enrichment(ip, "abuseipdb")
-        if not abuse_data:
-            abuse_data = abuseipdb_client.search_ip(ip)
-            if abuse_data:
-                cache_enrichment(ip, "ip", "abuseipdb", json.dumps(abuse_data, default=str))
-        ip_entry["abuseipdb"] = abuse_data
-
+        for api_source in ("ipinfo", "abuseipdb"):
+            ip_entry[api_source] = _cached_or_fetch(ip, "ip", api_source)
         ip_results.append(ip_entry)
 
     result["resolved_ips"] = ip_results
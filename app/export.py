@@ -0,0 +1,671 @@
+"""
+export.py — Stream the IOC set out as blocklists for firewalls and DNS resolvers.
+
+Formats (one file per IOC type, written atomically):
+    text   sorted, deduplicated, one indicator per line         *_ips.txt, *_domains.txt, *_urls.txt
+    cidr   IPs aggregated into the fewest covering CIDR blocks  *_ips.cidr.txt
+    bin    sorted fixed-width arrays that can be mmap'ed        *_ips.bin, *_ips6.bin, *_domains.bin, *_urls.bin
+
+Binary layout (all integers little-endian):
+    header  magic b"IOCB", u16 version, u16 kind, u64 count, u64 index_offset
+    kind 1  IPv4: count × u32, ascending
+    kind 2  IPv6: count × 16 raw bytes, ascending (memcmp order)
+    kind 3  strings: UTF-8 bytes back to back in byte order, then at
+            index_offset (count + 1) × u64 start offsets into the file
+Lookups are a binary search over the mapped file (see BlocklistReader).
+
+Rows come straight off the indexes in sorted order (ip_key is an integer,
+hosts.host is UNIQUE), so nothing is sorted in Python. With --incremental
+NAME only rows added since the last export under NAME are written; removals
+by retention.py are picked up by the next full export. --min-score cannot be
+combined with --incremental: scores arrive after the row, and a row skipped
+for its score would fall behind the saved position for good. In sharded mode each
+shard is streamed in order and the streams are merged; incremental state is
+kept per shard and starts over after a rebalance.
+
+Usage:
+    python app/export.py [--format text,cidr,bin] [--types ip,domain,url] [--out DIR]
+                         [--source URL] [--since-days N] [--min-score N] [--incremental NAME]
+                         [--verify]
+    python app/export.py --import FILE [--source-label LABEL]
+"""
+
+import argparse
+import heapq
+import ipaddress
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from contextlib import ExitStack
+from pathlib import Path
+
+from normalizer import classify_indicator, is_url
+from storage import DB_PATH, init_db, ioc_connections, store_iocs, decode_ip, encode_ip, table_exists
+
+EXPORT_DIR = Path("exports")
+FETCH_SIZE = 50_000
+
+# Largest CIDR block --import expands into single addresses (a /16)
+MAX_CIDR_ADDRESSES = 65_536
+
+BIN_MAGIC = b"IOCB"
+BIN_VERSION = 1
+BIN_HEADER = struct.Struct("<4sHHQQ")
+KIND_IPV4 = 1
+KIND_IPV6 = 2
+KIND_STRINGS = 3
+
+# JSON paths (per enrichment provider) that hold a 0-100-ish maliciousness score
+SCORE_PATHS = {
+    "abuseipdb": ["$.abuseConfidenceScore", "$.data.abuseConfidenceScore"],
+    "virustotal": ["$.last_analysis_stats.malicious", "$.data.attributes.last_analysis_stats.malicious"],
+}
+
+EXPORT_QUERIES = {
+    "ip": "SELECT t.id, t.ip_key FROM ip_iocs t {where} ORDER BY t.ip_key",
+    "domain": "SELECT t.id, h.host FROM hosts h JOIN domain_iocs t ON t.host_id = h.id {where} ORDER BY h.host",
+    "url": (
+        "SELECT t.id, t.scheme || '://' || h.host || t.path AS url "
+        "FROM url_iocs t JOIN hosts h ON h.id = t.host_id {where} ORDER BY url"
+    ),
+}
+
+# Rows not yet moved out of the pre-compact text tables (migrate.py --compact).
+# They have no last_seen, so --since-days filters them on first_seen.
+LEGACY_EXPORT_QUERIES = {
+    "ip": ("ip_iocs_legacy", "SELECT t.id, t.ip_address FROM ip_iocs_legacy t {where}"),
+    "domain": (
+        "domain_iocs_legacy",
+        "SELECT t.id, t.domain_or_url FROM domain_iocs_legacy t {where} AND t.ioc_type = 'domain' "
+        "ORDER BY t.domain_or_url",
+    ),
+    "url": (
+        "domain_iocs_legacy",
+        "SELECT t.id, t.domain_or_url FROM domain_iocs_legacy t {where} AND t.ioc_type = 'url' "
+        "ORDER BY t.domain_or_url",
+    ),
+}
+
+FILE_NAMES = {"ip": "ips", "domain": "domains", "url": "urls"}
+
+
+# ==================== FILTERS ====================
+
+def _build_filters(source_id: int | None, since_days: int | None, after_id: int,
+                   seen_column: str = "last_seen") -> tuple[str, tuple]:
+    clauses = ["t.id > ?"]
+    params = [after_id]
+
+    if source_id is not None:
+        clauses.append("t.source_id = ?")
+        params.append(source_id)
+    if since_days:
+        clauses.append(f"t.{seen_column} >= datetime('now', ?)")
+        params.append(f"-{int(since_days)} days")
+
+    return "WHERE " + " AND ".join(clauses), tuple(params)
+
+
+def _scored_values(cursor, min_score: float) -> set:
+    """IOC values whose cached enrichment reaches min_score with any provider."""
+    scored = set()
+    for api_source, paths in SCORE_PATHS.items():
+        score = "COALESCE(" + ", ".join(f"json_extract(result_json, '{path}')" for path in paths) + ")"
+        cursor.execute(
+            f"SELECT ioc_value FROM enrichment_results WHERE api_source = ? AND {score} >= ?",
+            (api_source, min_score)
+        )
+        scored.update(row[0] for row in cursor.fetchall())
+    return scored
+
+
+# ==================== STREAMING ====================
+
+def _ip_sort_key(key):
+    # SQLite orders INTEGER (IPv4) before BLOB (IPv6)
+    return (not isinstance(key, int), key)
+
+
+def _stream(cursor, ioc_type: str, where: str, params: tuple, scored: set | None, state: dict):
+    """Yield indicator values in sorted order, tracking the highest id seen in state."""
+    cursor.execute(EXPORT_QUERIES[ioc_type].format(where=where), params)
+    max_id = state.get(ioc_type, 0)
+
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        for row_id, value in rows:
+            if row_id > max_id:
+                max_id = row_id
+            if ioc_type == "ip":
+                if scored is not None and decode_ip(value) not in scored:
+                    continue
+            elif scored is not None and value not in scored:
+                continue
+            yield value
+
+    state[ioc_type] = max(state.get(ioc_type, 0), max_id)
+
+
+def _stream_legacy(cursor, ioc_type: str, where: str, params: tuple, scored: set | None, state: dict):
+    """
+    Like _stream, for rows still in a *_legacy table. Legacy IPs are text,
+    so they are encoded and sorted here; the table drains as the backfill
+    runs, so this stays small.
+    """
+    table, query = LEGACY_EXPORT_QUERIES[ioc_type]
+    cursor.execute(query.format(where=where), params)
+    rows = cursor.fetchall()
+    if rows:
+        state[ioc_type] = max(state.get(ioc_type, 0), max(row[0] for row in rows))
+
+    if ioc_type == "ip":
+        keys = (encode_ip(ip.strip()) for _, ip in rows)
+        values = sorted((key for key in keys if key is not None), key=_ip_sort_key)
+    else:
+        values = [value for _, value in rows]
+
+    for value in values:
+        if scored is not None and (decode_ip(value) if ioc_type == "ip" else value) not in scored:
+            continue
+        yield value
+
+
+def _unique(values):
+    """Drop adjacent duplicates from a sorted stream."""
+    previous = object()
+    for value in values:
+        if value != previous:
+            yield value
+        previous = value
+
+
+def _ipv4_ranges(keys):
+    """Merge ascending IPv4 integers into inclusive (start, end) ranges."""
+    start = end = None
+    for key in keys:
+        if end is not None and key <= end + 1:
+            end = max(end, key)
+            continue
+        if start is not None:
+            yield start, end
+        start = end = key
+    if start is not None:
+        yield start, end
+
+
+def _range_to_cidrs(start: int, end: int):
+    while start <= end:
+        size = start & -start if start else 1 << 32
+        while size > end - start + 1:
+            size >>= 1
+        yield f"{start >> 24}.{(start >> 16) & 255}.{(start >> 8) & 255}.{start & 255}/{33 - size.bit_length()}"
+        start += size
+
+
+# ==================== WRITERS ====================
+
+class _AtomicFile:
+    """Write to a temporary file and rename it into place on success."""
+
+    def __init__(self, path: Path, mode: str):
+        self.path = path
+        self.tmp_path = path.with_name(path.name + ".tmp")
+        self.mode = mode
+
+    def __enter__(self):
+        self.file = open(self.tmp_path, self.mode, **({} if "b" in self.mode else {"encoding": "utf-8"}))
+        return self.file
+
+    def __exit__(self, exc_type, exc, tb):
+        self.file.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+        else:
+            self.tmp_path.unlink(missing_ok=True)
+
+
+def _write_bin_header(f, kind: int, count: int, index_offset: int = 0):
+    f.seek(0)
+    f.write(BIN_HEADER.pack(BIN_MAGIC, BIN_VERSION, kind, count, index_offset))
+
+
+def _write_ip_exports(values, out: Path, prefix: str, formats: set) -> int:
+    """Single pass over sorted ip_keys feeding every requested IP format."""
+    v4 = array("I")
+    v6 = []
+    count = 0
+
+    with ExitStack() as stack:
+        text_file = None
+        if "text" in formats:
+            text_file = stack.enter_context(_AtomicFile(out / f"{prefix}_ips.txt", "w"))
+
+        for key in values:
+            count += 1
+            if isinstance(key, int):
+                v4.append(key)
+            else:
+                v6.append(bytes(key))
+            if text_file:
+                text_file.write(decode_ip(key) + "\n")
+
+    if "cidr" in formats:
+        with _AtomicFile(out / f"{prefix}_ips.cidr.txt", "w") as f:
+            for start, end in _ipv4_ranges(v4):
+                f.writelines(cidr + "\n" for cidr in _range_to_cidrs(start, end))
+            v6_networks = (ipaddress.IPv6Network((ipaddress.IPv6Address(key), 128)) for key in v6)
+            f.writelines(f"{network}\n" for network in ipaddress.collapse_addresses(v6_networks))
+
+    if "bin" in formats:
+        with _AtomicFile(out / f"{prefix}_ips.bin", "wb") as f:
+            _write_bin_header(f, KIND_IPV4, len(v4))
+            if sys.byteorder != "little":
+                v4.byteswap()
+            v4.tofile(f)
+        if v6:
+            with _AtomicFile(out / f"{prefix}_ips6.bin", "wb") as f:
+                _write_bin_header(f, KIND_IPV6, len(v6))
+                f.write(b"".join(v6))
+
+    return count
+
+
+def _write_string_exports(values, out: Path, prefix: str, name: str, formats: set) -> int:
+    """Single pass over sorted strings feeding the text and binary formats."""
+    count = 0
+    offsets = array("Q")
+
+    with ExitStack() as stack:
+        text_file = bin_file = None
+        if "text" in formats:
+            text_file = stack.enter_context(_AtomicFile(out / f"{prefix}_{name}.txt", "w"))
+        if "bin" in formats:
+            bin_file = stack.enter_context(_AtomicFile(out / f"{prefix}_{name}.bin", "wb"))
+            bin_file.write(b"\0" * BIN_HEADER.size)
+
+        position = BIN_HEADER.size
+        for value in values:
+            count += 1
+            if text_file:
+                text_file.write(value + "\n")
+            if bin_file:
+                encoded = value.encode("utf-8")
+                offsets.append(position)
+                bin_file.write(encoded)
+                position += len(encoded)
+
+        if bin_file:
+            offsets.append(position)
+            if sys.byteorder != "little":
+                offsets.byteswap()
+            offsets.tofile(bin_file)
+            _write_bin_header(bin_file, KIND_STRINGS, count, position)
+
+    return count
+
+
+# ==================== EXPORT ====================
+
+def _ensure_export_state(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS export_state (
+            name         TEXT NOT NULL,
+            ioc_type     TEXT NOT NULL,
+            last_id      INTEGER NOT NULL,
+            exported_at  DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (name, ioc_type)
+        )
+        """
+    )
+
+
+def export_blocklists(
+    formats: set,
+    ioc_types: list,
+    out: Path = EXPORT_DIR,
+    source: str | None = None,
+    since_days: int | None = None,
+    min_score: float | None = None,
+    incremental: str | None = None,
+) -> dict:
+    """Write the requested blocklists; returns the number of indicators per type."""
+    if incremental and min_score is not None:
+        raise ValueError("--min-score cannot be combined with --incremental (use a full export)")
+
+    out.mkdir(parents=True, exist_ok=True)
+    connections = ioc_connections()
+    main_cursor = connections[0].cursor()
+
+    # Sources and the enrichment cache live in the main DB
+    source_id = None
+    if source:
+        main_cursor.execute("SELECT id FROM sources WHERE source_url = ?", (source,))
+        row = main_cursor.fetchone()
+        # An unknown source matches nothing
+        source_id = row[0] if row else -1
+
+    scored = _scored_values(main_cursor, min_score) if min_score is not None else None
+    prefix = incremental or "full"
+    counts = {}
+
+    # Per connection: ioc_type -> last exported id
+    states = []
+    for conn in connections:
+        state = {}
+        if incremental:
+            cursor = conn.cursor()
+            _ensure_export_state(cursor)
+            cursor.execute("SELECT ioc_type, last_id FROM export_state WHERE name = ?", (incremental,))
+            state = dict(cursor.fetchall())
+        states.append(state)
+
+    for ioc_type in ioc_types:
+        streams = []
+        for conn, state in zip(connections, states):
+            where, params = _build_filters(source_id, since_days, state.get(ioc_type, 0))
+            streams.append(_stream(conn.cursor(), ioc_type, where, params, scored, state))
+
+            if table_exists(conn.cursor(), LEGACY_EXPORT_QUERIES[ioc_type][0]):
+                where, params = _build_filters(source_id, since_days, state.get(ioc_type, 0), "first_seen")
+                streams.append(_stream_legacy(conn.cursor(), ioc_type, where, params, scored, state))
+
+        if len(streams) == 1:
+            values = streams[0]
+        else:
+            # A value can be in more than one stream while the legacy backfill runs
+            values = _unique(heapq.merge(*streams, key=_ip_sort_key if ioc_type == "ip" else None))
+
+        if ioc_type == "ip":
+            counts[ioc_type] = _write_ip_exports(values, out, prefix, formats)
+        else:
+            counts[ioc_type] = _write_string_exports(values, out, prefix, FILE_NAMES[ioc_type], formats - {"cidr"})
+
+    for conn, state in zip(connections, states):
+        if incremental:
+            conn.executemany(
+                """
+                INSERT INTO export_state (name, ioc_type, last_id) VALUES (?, ?, ?)
+                ON CONFLICT(name, ioc_type)
+                DO UPDATE SET last_id = excluded.last_id, exported_at = CURRENT_TIMESTAMP
+                """,
+                ((incremental, ioc_type, state[ioc_type]) for ioc_type in ioc_types)
+            )
+            conn.commit()
+        conn.close()
+
+    return counts
+
+
+# ==================== READ / IMPORT ====================
+
+class BlocklistReader:
+    """Memory-mapped view of a binary export with O(log n) membership tests."""
+
+    def __init__(self, path: Path):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.kind, self.count, self._index = BIN_HEADER.unpack_from(self._map, 0)
+        if magic != BIN_MAGIC or version != BIN_VERSION:
+            raise ValueError(f"{path} is not a version {BIN_VERSION} IOC blocklist")
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __len__(self):
+        return self.count
+
+    def _item(self, i: int):
+        base = BIN_HEADER.size
+        if self.kind == KIND_IPV4:
+            return struct.unpack_from("<I", self._map, base + 4 * i)[0]
+        if self.kind == KIND_IPV6:
+            return self._map[base + 16 * i:base + 16 * (i + 1)]
+        start, end = struct.unpack_from("<QQ", self._map, self._index + 8 * i)
+        return self._map[start:end]
+
+    def __iter__(self):
+        for i in range(self.count):
+            item = self._item(i)
+            if self.kind == KIND_STRINGS:
+                yield item.decode("utf-8")
+            elif self.kind == KIND_IPV6:
+                yield str(ipaddress.IPv6Address(item))
+            else:
+                yield decode_ip(item)
+
+    def __contains__(self, value: str) -> bool:
+        if self.kind == KIND_IPV4:
+            try:
+                needle = int(ipaddress.IPv4Address(value))
+            except ValueError:
+                return False
+        elif self.kind == KIND_IPV6:
+            try:
+                needle = ipaddress.IPv6Address(value).packed
+            except ValueError:
+                return False
+        else:
+            needle = value.encode("utf-8")
+
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._item(mid) < needle:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < self.count and self._item(lo) == needle
+
+
+def _read_values(path: Path):
+    with open(path, "rb") as f:
+        is_binary = f.read(len(BIN_MAGIC)) == BIN_MAGIC
+
+    if is_binary:
+        reader = BlocklistReader(path)
+        try:
+            yield from reader
+        finally:
+            reader.close()
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+def _classify_import_value(value: str, rejected: dict | None = None):
+    """
+    Yield (kind, normalized) for one blocklist entry. IPs (v4 or v6) are
+    recognised with encode_ip, and CIDR lines from the cidr export are
+    expanded into their addresses; anything else goes through the normalizer,
+    which counts domains without a real public suffix in `rejected`.
+    """
+    if "/" in value and not is_url(value.lower()):
+        try:
+            network = ipaddress.ip_network(value, strict=False)
+        except ValueError:
+            network = None
+        if network is not None:
+            if network.num_addresses > MAX_CIDR_ADDRESSES:
+                raise ValueError(
+                    f"CIDR block {value} covers {network.num_addresses} addresses; "
+                    f"--import expands at most {MAX_CIDR_ADDRESSES} per line"
+                )
+            for address in network:
+                yield "ips", decode_ip(encode_ip(str(address)))
+            return
+
+    ip_key = encode_ip(value)
+    if ip_key is not None:
+        yield "ips", decode_ip(ip_key)
+        return
+
+    classified = classify_indicator(value, rejected)
+    if classified is not None:
+        yield classified
+
+
+def parse_blocklist(path: Path, rejected: dict | None = None):
+    """Yield (kind, normalized) for every entry of a text, CIDR or binary export."""
+    for value in _read_values(path):
+        yield from _classify_import_value(value, rejected)
+
+
+def import_blocklist(path: Path, source_label: str | None = None, rejected: dict | None = None) -> dict:
+    """
+    Bulk-load a text, CIDR or binary export back into the IOC tables.
+    Entries dropped by the public suffix check are counted in `rejected`.
+    """
+    source_label = source_label or f"file://{path.resolve()}"
+    counts = {"ips": 0, "domains": 0, "urls": 0}
+    batch = {"ips": [], "domains": [], "urls": []}
+    pending = 0
+
+    for kind, normalized in parse_blocklist(path, rejected):
+        batch[kind].append(normalized)
+        counts[kind] += 1
+        pending += 1
+
+        # One transaction per batch keeps the write lock short
+        if pending >= FETCH_SIZE:
+            store_iocs(batch, source_label)
+            batch = {"ips": [], "domains": [], "urls": []}
+            pending = 0
+
+    if pending:
+        store_iocs(batch, source_label)
+
+    return counts
+
+
+def _export_files(out: Path, prefix: str, ioc_type: str, formats: set) -> list[list[Path]]:
+    """Files written for one IOC type, grouped by what must read back as the full set."""
+    name = FILE_NAMES[ioc_type]
+    groups = []
+    if "text" in formats:
+        groups.append([out / f"{prefix}_{name}.txt"])
+    if "cidr" in formats and ioc_type == "ip":
+        groups.append([out / f"{prefix}_ips.cidr.txt"])
+    if "bin" in formats:
+        # Binary IPv4 and IPv6 are split over two files
+        paths = [out / f"{prefix}_{name}.bin"]
+        if ioc_type == "ip" and (out / f"{prefix}_ips6.bin").exists():
+            paths.append(out / f"{prefix}_ips6.bin")
+        groups.append(paths)
+    return groups
+
+
+def verify_exports(out: Path, prefix: str, formats: set, counts: dict) -> list[str]:
+    """
+    Read every file of an export back through the --import parser and check
+    it yields exactly as many indicators as were written. Returns the problems.
+    """
+    kinds = {"ip": "ips", "domain": "domains", "url": "urls"}
+    problems = []
+
+    for ioc_type, expected in counts.items():
+        for paths in _export_files(out, prefix, ioc_type, formats):
+            values = set()
+            other = 0
+            for path in paths:
+                for kind, value in parse_blocklist(path):
+                    if kind == kinds[ioc_type]:
+                        values.add(value)
+                    else:
+                        other += 1
+            if len(values) != expected or other:
+                names = " + ".join(path.name for path in paths)
+                problems.append(f"{names}: read back {len(values)} {kinds[ioc_type]} and {other} others, wrote {expected}")
+
+    return problems
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export IOC blocklists or import them back.")
+    parser.add_argument("--format", default="text,cidr,bin",
+                        help="comma-separated formats: text, cidr, bin (default: all)")
+    parser.add_argument("--types", default="ip,domain,url",
+                        help="comma-separated IOC types: ip, domain, url (default: all)")
+    parser.add_argument("--out", type=Path, default=EXPORT_DIR, help=f"output directory (default: {EXPORT_DIR})")
+    parser.add_argument("--source", help="only export indicators from this source URL")
+    parser.add_argument("--since-days", type=int, help="only export indicators seen in the last N days")
+    parser.add_argument("--min-score", type=float,
+                        help="only export indicators whose cached enrichment score is at least this")
+    parser.add_argument("--incremental", metavar="NAME",
+                        help="only export rows added since the last export with this name")
+    parser.add_argument("--verify", action="store_true",
+                        help="read every exported file back through the importer and compare")
+    parser.add_argument("--import", dest="import_path", type=Path, metavar="FILE",
+                        help="import a text or binary blocklist instead of exporting")
+    parser.add_argument("--source-label", help="source recorded for imported indicators")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if not DB_PATH.exists() and not args.import_path:
+        print(f"❌ Database not found at {DB_PATH}")
+        raise SystemExit(1)
+
+    init_db()
+    started = time.monotonic()
+
+    if args.import_path:
+        rejected = {}
+        try:
+            counts = import_blocklist(args.import_path, args.source_label, rejected)
+        except ValueError as e:
+            print(f"❌ {e}")
+            raise SystemExit(1)
+        print(f"✅ Imported {args.import_path} in {time.monotonic() - started:.1f}s")
+        print(f"   URLs: {counts['urls']}, Domains: {counts['domains']}, IPs: {counts['ips']}")
+        if rejected:
+            print(
+                f"   Rejected domain candidates: {sum(rejected.values())} "
+                f"(unknown suffix: {rejected.get('unknown_suffix', 0)}, bare suffix: {rejected.get('bare_suffix', 0)})"
+            )
+        raise SystemExit(0)
+
+    formats = {f.strip() for f in args.format.split(",") if f.strip()}
+    ioc_types = [t.strip() for t in args.types.split(",") if t.strip()]
+    unknown = (formats - {"text", "cidr", "bin"}) | (set(ioc_types) - set(EXPORT_QUERIES))
+    if unknown:
+        print(f"❌ Unknown format or type: {', '.join(sorted(unknown))}")
+        raise SystemExit(1)
+
+    try:
+        counts = export_blocklists(
+            formats,
+            ioc_types,
+            out=args.out,
+            source=args.source,
+            since_days=args.since_days,
+            min_score=args.min_score,
+            incremental=args.incremental,
+        )
+    except ValueError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+
+    print(f"✅ Exported to {args.out}/ in {time.monotonic() - started:.1f}s")
+    for ioc_type, count in counts.items():
+        print(f"   {FILE_NAMES[ioc_type]}: {count}")
+
+    if args.verify:
+        problems = verify_exports(args.out, args.incremental or "full", formats, counts)
+        for problem in problems:
+            print(f"❌ {problem}")
+        if problems:
+            raise SystemExit(1)
+        print("✅ Every exported file reads back through --import")
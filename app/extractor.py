@@ -1,5 +1,7 @@
 import re
 
+from public_suffix import filter_domains
+
 
 URL_REGEX = re.compile(
     r"https?://[^\s\"'>]+",
@@ -15,13 +17,25 @@ IP_REGEX = re.compile(
 )
 
 
-def extract_indicators(content: str):
-    urls = set(URL_REGEX.findall(content))
-    domains = set(DOMAIN_REGEX.findall(content))
-    ips = set(IP_REGEX.findall(content))
+def find_candidates(content: str) -> dict:
+    """Distinct raw URL, domain and IP matches, before any domain filtering."""
+    return {
+        "urls": set(URL_REGEX.findall(content)),
+        "domains": set(DOMAIN_REGEX.findall(content)),
+        "ips": set(IP_REGEX.findall(content))
+    }
+
+
+def extract_indicators(content: str, rejected: dict | None = None):
+    """
+    Find URL, domain and IP candidates in raw content. Domain candidates
+    without a real public suffix (payload.exe, readme.txt) are dropped and
+    counted per reason in `rejected` if given.
+    """
+    candidates = find_candidates(content)
 
     return {
-        "urls": list(urls),
-        "domains": list(domains),
-        "ips": list(ips)
+        "urls": list(candidates["urls"]),
+        "domains": filter_domains(candidates["domains"], rejected),
+        "ips": list(candidates["ips"])
     }
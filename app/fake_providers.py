@@ -0,0 +1,76 @@
+"""
+fake_providers.py — Offline stand-ins for the enrichment APIs.
+
+Deterministic results derived from a hash of the indicator, shaped like the
+real clients' responses, with no network access or API keys. Used for tests
+and benchmarks via IOC_PROVIDERS=fake (see providers.py).
+"""
+
+import hashlib
+
+from providers import Provider
+
+
+def _digest(value: str) -> bytes:
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+
+
+def _fake_ip(seed: bytes) -> str:
+    return f"{seed[0] % 223 + 1}.{seed[1]}.{seed[2]}.{seed[3]}"
+
+
+class FakeVirusTotal(Provider):
+    name = "virustotal"
+
+    def _report(self, value: str) -> dict:
+        seed = _digest(value)
+        return {
+            "id": value,
+            "last_analysis_stats": {
+                "malicious": seed[4] % 20,
+                "suspicious": seed[5] % 5,
+                "harmless": 60 + seed[6] % 20,
+                "undetected": 10,
+            },
+            "reputation": -(seed[7] % 50),
+        }
+
+    def search_ip(self, ip_address: str) -> dict | None:
+        data = self._report(ip_address)
+        data["resolutions"] = []
+        data["communicating_files"] = []
+        return data
+
+    def search_domain(self, domain: str) -> dict | None:
+        data = self._report(domain)
+        data["subdomains"] = []
+        data["communicating_files"] = []
+        return data
+
+    def domain_resolutions(self, domain: str) -> list[dict]:
+        seed = _digest(domain)
+        return [{"ip_address": _fake_ip(seed[i:i + 4])} for i in range(0, 4 * (seed[8] % 3 + 1), 4)]
+
+
+class FakeIPInfo(Provider):
+    name = "ipinfo"
+
+    def search_ip(self, ip_address: str) -> dict | None:
+        seed = _digest(ip_address)
+        return {
+            "ip": ip_address,
+            "country": ["US", "DE", "NL", "RU", "CN", "IN"][seed[0] % 6],
+            "org": f"AS{64512 + seed[1] * 4 + seed[2] % 4} Fake Networks",
+        }
+
+
+class FakeAbuseIPDB(Provider):
+    name = "abuseipdb"
+
+    def search_ip(self, ip_address: str) -> dict | None:
+        seed = _digest(ip_address)
+        return {
+            "ipAddress": ip_address,
+            "abuseConfidenceScore": seed[0] % 101,
+            "totalReports": seed[1],
+        }
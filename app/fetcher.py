@@ -2,9 +2,10 @@ import requests
 from pathlib import Path
 
 
-def fetch_url(url: str):
+def fetch_url(url: str, session: requests.Session | None = None):
+    """Fetch a URL; pass a requests.Session to reuse its keep-alive connections."""
     try:
-        response = requests.get(url, timeout=10)
+        response = (session or requests).get(url, timeout=10)
 
         return {
             "success": True,
@@ -3,8 +3,7 @@ import os
 
 from fetcher import fetch_url, read_file
 from detector import detect_content_type
-from extractor import extract_indicators
-from normalizer import normalize_indicators
+from parallel_extract import extract_normalized
 from storage import (
     init_db,
     store_iocs,
@@ -52,8 +51,8 @@ def main():
 
     print("Detected Content Type:", detected_type)
 
-    raw_indicators = extract_indicators(result["content"])
-    normalized = normalize_indicators(raw_indicators)
+    rejected = {}
+    normalized = extract_normalized(result["content"], rejected=rejected)
 
     store_iocs(normalized, source_label)
 
@@ -63,6 +62,11 @@ def main():
         f"Domains: {len(normalized['domains'])}, "
         f"IPs: {len(normalized['ips'])}"
     )
+    if rejected:
+        print(
+            f"Rejected domain candidates: {sum(rejected.values())} "
+            f"(unknown suffix: {rejected.get('unknown_suffix', 0)}, bare suffix: {rejected.get('bare_suffix', 0)})"
+        )
 
 
 if __name__ == "__main__":
@@ -1,41 +1,118 @@
 """
-migrate.py — One-time migration script.
+migrate.py — Streaming, resumable migrations of legacy data.
 
-Moves existing data from the old `raw_iocs` table into the new
-`ip_iocs` and `domain_iocs` tables, using regex to classify each IOC.
+Default mode moves existing data from the old `raw_iocs` table into the
+`ip_iocs`, `domain_iocs` and `url_iocs` tables. Rows are streamed in rowid
+order with `fetchmany`, classified with the shared normalizer and
+bulk-inserted one batch per transaction. The last committed rowid is
+checkpointed in the same transaction, so an interrupted run picks up where
+it stopped.
+
+--compact backfills the text-keyed tables from before the compact layout
+(renamed to *_legacy by init_db) into the compact tables. Each batch is
+copied and deleted from the legacy table in one transaction, so the
+database stays usable throughout and the run can be interrupted at any point.
+
+In sharded mode (see sharding.py) both modes write each batch to the
+shards, committing it there before the checkpoint or the legacy delete, so
+a batch cut off in between is simply copied again on the next run.
 
 Usage:
-    python app/migrate.py
+    python app/migrate.py [--batch-size N] [--restart]
+    python app/migrate.py --compact [--batch-size N]
 """
 
-import re
-import sqlite3
-from pathlib import Path
+import argparse
+import time
+
+import sharding
+from normalizer import classify_indicator, split_url
+from storage import DB_PATH, get_connection, init_db, insert_indicators, encode_ip, table_exists
+
+CHECKPOINT_NAME = "raw_iocs"
+DEFAULT_BATCH_SIZE = 10_000
+
+
+def _ensure_checkpoint_table(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS migration_checkpoints (
+            name        TEXT PRIMARY KEY,
+            last_rowid  INTEGER NOT NULL,
+            ip_count    INTEGER NOT NULL DEFAULT 0,
+            domain_count INTEGER NOT NULL DEFAULT 0,
+            url_count   INTEGER NOT NULL DEFAULT 0,
+            updated_at  DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+def _load_checkpoint(cursor) -> tuple[int, dict]:
+    """Return (last_rowid, counts) of the last committed batch, or a fresh start."""
+    cursor.execute(
+        "SELECT last_rowid, ip_count, domain_count, url_count FROM migration_checkpoints WHERE name = ?",
+        (CHECKPOINT_NAME,)
+    )
+    row = cursor.fetchone()
+    if not row:
+        return 0, {"ips": 0, "domains": 0, "urls": 0}
+    return row[0], {"ips": row[1], "domains": row[2], "urls": row[3]}
 
-DB_PATH = Path("db/raw_iocs.db")
 
+def _save_checkpoint(cursor, last_rowid: int, counts: dict):
+    cursor.execute(
+        """
+        INSERT INTO migration_checkpoints (name, last_rowid, ip_count, domain_count, url_count)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(name)
+        DO UPDATE SET
+            last_rowid = excluded.last_rowid,
+            ip_count = excluded.ip_count,
+            domain_count = excluded.domain_count,
+            url_count = excluded.url_count,
+            updated_at = CURRENT_TIMESTAMP
+        """,
+        (CHECKPOINT_NAME, last_rowid, counts["ips"], counts["domains"], counts["urls"])
+    )
 
-def is_ip(value: str) -> bool:
-    """Check if the IOC value is an IP address."""
-    pattern = r'^\d{1,3}(\.\d{1,3}){3}$'
-    if re.match(pattern, value):
-        parts = value.split('.')
-        return all(0 <= int(p) <= 255 for p in parts)
-    return False
 
+def _classify_batch(rows: list, counts: dict, rejected: dict) -> dict:
+    """
+    Split a batch of (rowid, ioc_value) rows into ips / domains / urls;
+    domains without a real public suffix are counted in `rejected`.
+    """
+    batch = {"ips": [], "domains": [], "urls": []}
 
-def is_url(value: str) -> bool:
-    """Check if the IOC value is a URL."""
-    return value.startswith("http://") or value.startswith("https://")
+    for _, ioc_value in rows:
+        if ioc_value is None:
+            continue
+        classified = classify_indicator(ioc_value, rejected)
+        if classified is None:
+            continue
+        kind, value = classified
+        batch[kind].append(value)
+        counts[kind] += 1
 
+    return batch
 
-def migrate():
+
+def _print_progress(last_rowid: int, max_rowid: int, processed: int, started: float):
+    elapsed = max(time.monotonic() - started, 1e-6)
+    percent = 100.0 * last_rowid / max_rowid if max_rowid else 100.0
+    print(
+        f"   … rowid {last_rowid}/{max_rowid} ({percent:5.1f}%)  "
+        f"{processed} rows this run  {processed / elapsed:,.0f} rows/s"
+    )
+
+
+def migrate(batch_size: int = DEFAULT_BATCH_SIZE, restart: bool = False):
     if not DB_PATH.exists():
         print(f"❌ Database not found at {DB_PATH}")
         print("   Run the data pipeline first to create the database.")
         return
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
     # Check if old raw_iocs table exists
@@ -46,63 +123,261 @@ def migrate():
         conn.close()
         return
 
-    # Create the new tables if they don't exist
-    schema_path = Path("db/schema.sql")
-    if schema_path.exists():
-        with open(schema_path, "r") as f:
-            conn.executescript(f.read())
-        conn.commit()
+    # Create the new tables (and stat counters) if they don't exist
+    init_db()
 
-    # Read all existing IOCs
-    cursor.execute("SELECT ioc_value FROM raw_iocs")
-    rows = cursor.fetchall()
+    _ensure_checkpoint_table(cursor)
+    if restart:
+        cursor.execute("DELETE FROM migration_checkpoints WHERE name = ?", (CHECKPOINT_NAME,))
+    conn.commit()
+
+    # MAX(rowid) is a single index seek, unlike COUNT(*)
+    cursor.execute("SELECT MAX(rowid) FROM raw_iocs")
+    max_rowid = cursor.fetchone()[0]
 
-    if not rows:
+    if max_rowid is None:
         print("⚠️  raw_iocs table is empty — nothing to migrate.")
         conn.close()
         return
 
-    ip_count = 0
-    domain_count = 0
-    url_count = 0
+    last_rowid, counts = _load_checkpoint(cursor)
+    if last_rowid >= max_rowid:
+        print("✅ Migration already complete — nothing left to do.")
+        print("   Pass --restart to migrate everything again.")
+        conn.close()
+        return
+    if last_rowid:
+        print(f"↻ Resuming after rowid {last_rowid}")
+
+    # Batches are committed individually; fsync on every commit is not needed
+    # because the checkpoint makes a lost batch safe to redo.
+    conn.execute("PRAGMA synchronous = NORMAL")
 
-    for (ioc_value,) in rows:
-        value = ioc_value.strip()
+    reader = conn.cursor()
+    reader.execute(
+        "SELECT rowid, ioc_value FROM raw_iocs WHERE rowid > ? ORDER BY rowid",
+        (last_rowid,)
+    )
 
-        if is_ip(value):
-            cursor.execute(
-                "INSERT OR IGNORE INTO ip_iocs (ip_address) VALUES (?)",
-                (value,)
-            )
-            ip_count += 1
+    started = time.monotonic()
+    processed = 0
+    rejected = {}
 
-        elif is_url(value):
-            cursor.execute(
-                "INSERT OR IGNORE INTO domain_iocs (domain_or_url, ioc_type) VALUES (?, 'url')",
-                (value,)
-            )
-            url_count += 1
+    while True:
+        rows = reader.fetchmany(batch_size)
+        if not rows:
+            break
 
+        batch = _classify_batch(rows, counts, rejected)
+        if sharding.is_enabled():
+            sharding.store_iocs(batch, None)
         else:
-            # Assume domain
-            cursor.execute(
-                "INSERT OR IGNORE INTO domain_iocs (domain_or_url, ioc_type) VALUES (?, 'domain')",
-                (value,)
-            )
-            domain_count += 1
+            insert_indicators(cursor, batch)
+
+        last_rowid = rows[-1][0]
+        _save_checkpoint(cursor, last_rowid, counts)
+        conn.commit()
+
+        processed += len(rows)
+        _print_progress(last_rowid, max_rowid, processed, started)
 
-    conn.commit()
     conn.close()
 
+    elapsed = time.monotonic() - started
+    ip_count, domain_count, url_count = counts["ips"], counts["domains"], counts["urls"]
+
     print(f"✅ Migration complete!")
     print(f"   IPs migrated to ip_iocs:         {ip_count}")
     print(f"   Domains migrated to domain_iocs:  {domain_count}")
-    print(f"   URLs migrated to domain_iocs:     {url_count}")
+    print(f"   URLs migrated to url_iocs:        {url_count}")
     print(f"   Total processed:                  {ip_count + domain_count + url_count}")
+    print(f"   This run: {processed} rows in {elapsed:.1f}s ({processed / max(elapsed, 1e-6):,.0f} rows/s)")
+    if rejected:
+        print(
+            f"   Rejected domain candidates this run: {sum(rejected.values())} "
+            f"(unknown suffix: {rejected.get('unknown_suffix', 0)}, bare suffix: {rejected.get('bare_suffix', 0)})"
+        )
     print()
     print(f"💡 The old 'raw_iocs' table is still intact. You can drop it manually when ready:")
     print(f"   sqlite3 db/raw_iocs.db \"DROP TABLE raw_iocs;\"")
 
 
+# ==================== COMPACT LAYOUT BACKFILL ====================
+
+# A feed may have listed a legacy indicator again while the backfill was
+# pending, creating a newer compact row. Merge into it rather than dropping
+# the legacy row: the earlier sighting keeps its id, first_seen and source.
+KEEP_EARLIEST = """
+    id = CASE WHEN excluded.first_seen < first_seen THEN COALESCE(excluded.id, id) ELSE id END,
+    source_id = CASE WHEN excluded.first_seen < first_seen THEN excluded.source_id ELSE source_id END,
+    first_seen = MIN(first_seen, excluded.first_seen),
+    last_seen = MAX(last_seen, excluded.last_seen)
+"""
+
+
+def _copy_legacy_ips(route, rows: list, keep_ids: bool) -> int:
+    """
+    Copy (id, ip_address, first_seen, source_id) rows to the connection
+    route("ip", ip_key) returns; returns how many were unparseable.
+    """
+    targets = {}
+    skipped = 0
+    for row_id, ip, first_seen, source_id in rows:
+        ip_key = encode_ip(ip.strip())
+        if ip_key is None:
+            skipped += 1
+            continue
+        targets.setdefault(route("ip", ip_key), []).append(
+            (row_id if keep_ids else None, ip_key, first_seen, first_seen, source_id)
+        )
+
+    for conn, target_rows in targets.items():
+        conn.executemany(
+            f"""
+            INSERT INTO ip_iocs (id, ip_key, first_seen, last_seen, source_id) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(ip_key) DO UPDATE SET {KEEP_EARLIEST}
+            """,
+            target_rows
+        )
+    return skipped
+
+
+def _copy_legacy_domains(route, rows: list, keep_ids: bool) -> int:
+    """
+    Copy (id, domain_or_url, ioc_type, first_seen, source_id) rows into hosts /
+    domain_iocs / url_iocs of the connection route("host", host) returns.
+    """
+    targets = {}
+    for row_id, value, ioc_type, first_seen, source_id in rows:
+        row_id = row_id if keep_ids else None
+        if ioc_type == "url":
+            scheme, host, path = split_url(value)
+            domains, urls = targets.setdefault(route("host", host), ([], []))
+            urls.append((row_id, scheme, path, first_seen, first_seen, source_id, host))
+        else:
+            domains, urls = targets.setdefault(route("host", value), ([], []))
+            domains.append((row_id, first_seen, first_seen, source_id, value))
+
+    for conn, (domains, urls) in targets.items():
+        _copy_domain_rows(conn.cursor(), domains, urls)
+    return 0
+
+
+def _copy_domain_rows(cursor, domains: list, urls: list):
+    """Insert one target's domain and URL rows, interning their hosts first."""
+    hosts = {row[-1] for row in domains}
+    hosts.update(row[-1] for row in urls)
+    cursor.executemany("INSERT OR IGNORE INTO hosts (host) VALUES (?)", ((host,) for host in hosts))
+
+    cursor.executemany(
+        f"""
+        INSERT INTO domain_iocs (id, host_id, first_seen, last_seen, source_id)
+        SELECT ?, id, ?, ?, ? FROM hosts WHERE host = ?
+        ON CONFLICT(host_id) DO UPDATE SET {KEEP_EARLIEST}
+        """,
+        domains
+    )
+    cursor.executemany(
+        f"""
+        INSERT INTO url_iocs (id, host_id, scheme, path, first_seen, last_seen, source_id)
+        SELECT ?, id, ?, ?, ?, ?, ? FROM hosts WHERE host = ?
+        ON CONFLICT(host_id, scheme, path) DO UPDATE SET {KEEP_EARLIEST}
+        """,
+        urls
+    )
+
+
+LEGACY_BACKFILLS = [
+    ("ip_iocs_legacy", "SELECT id, ip_address, first_seen, source_id FROM ip_iocs_legacy", _copy_legacy_ips),
+    ("domain_iocs_legacy", "SELECT id, domain_or_url, ioc_type, first_seen, source_id FROM domain_iocs_legacy",
+     _copy_legacy_domains),
+]
+
+
+def migrate_compact(batch_size: int = DEFAULT_BATCH_SIZE):
+    if not DB_PATH.exists():
+        print(f"❌ Database not found at {DB_PATH}")
+        return
+
+    # Renames any text-keyed tables to *_legacy and creates the compact ones
+    init_db()
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    conn.execute("PRAGMA synchronous = NORMAL")
+
+    pending = [entry for entry in LEGACY_BACKFILLS if table_exists(cursor, entry[0])]
+    if not pending:
+        print("✅ Database already uses the compact layout — nothing to backfill.")
+        conn.close()
+        return
+
+    # Sharded: each row goes to its shard, whose ids are local to it
+    sharded = sharding.is_enabled()
+    shard_conns = {}
+
+    def route(kind, key):
+        if not sharded:
+            return conn
+        path = sharding.shard_path(kind, sharding.shard_index(kind, key, sharding.shard_count()))
+        if path not in shard_conns:
+            shard_conns[path] = sharding.connect_shard(path)
+        return shard_conns[path]
+
+    for legacy, select_sql, copy_batch in pending:
+        cursor.execute(f"SELECT MAX(id) FROM {legacy}")
+        max_id = cursor.fetchone()[0] or 0
+        print(f"Backfilling {legacy} …")
+
+        started = time.monotonic()
+        processed = 0
+        skipped = 0
+
+        while True:
+            # Copied rows are deleted, so the next batch always starts at the lowest id
+            cursor.execute(f"{select_sql} ORDER BY id LIMIT ?", (batch_size,))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            skipped += copy_batch(route, rows, not sharded)
+            for shard in shard_conns.values():
+                shard.commit()
+            last_id = rows[-1][0]
+            cursor.execute(f"DELETE FROM {legacy} WHERE id <= ?", (last_id,))
+            conn.commit()
+
+            processed += len(rows)
+            _print_progress(last_id, max_id, processed, started)
+
+        cursor.execute(f"DROP TABLE {legacy}")
+        conn.commit()
+
+        print(f"   {legacy}: {processed} rows processed, {skipped} unparseable rows dropped")
+
+    for shard in shard_conns.values():
+        shard.close()
+    conn.close()
+
+    print("✅ Compact layout backfill complete!")
+    print("💡 Freed pages are reused by new rows. To shrink the file now, run:")
+    print("   sqlite3 db/raw_iocs.db \"VACUUM;\"")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Migrate legacy IOC data into the current tables.")
+    parser.add_argument("--compact", action="store_true",
+                        help="backfill the pre-compact *_legacy tables instead of raw_iocs")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"rows per transaction (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore the saved checkpoint and start from the first row")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    migrate()
+    args = parse_args()
+    if args.compact:
+        migrate_compact(batch_size=args.batch_size)
+    else:
+        migrate(batch_size=args.batch_size, restart=args.restart)
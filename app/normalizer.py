@@ -1,5 +1,10 @@
 import re
 
+from public_suffix import check_domain, filter_domains
+
+
+IP_PATTERN = re.compile(r"^\d{1,3}(?:\.\d{1,3}){3}$")
+
 
 def refang(value: str) -> str:
     value = value.replace("[.]", ".")
@@ -25,24 +30,84 @@ def normalize_ip(ip: str) -> str:
     return ip.strip()
 
 
-def normalize_indicators(indicators: dict):
+def is_ip(value: str) -> bool:
+    """Check if the value is a dotted-quad IPv4 address."""
+    if not IP_PATTERN.match(value):
+        return False
+    return all(int(part) <= 255 for part in value.split("."))
+
+
+def is_url(value: str) -> bool:
+    """Check if the value is an http(s) URL."""
+    return value.startswith("http://") or value.startswith("https://")
+
+
+def split_url(url: str) -> tuple[str, str, str]:
+    """
+    Split a normalized URL into (scheme, host, path) such that
+    url == f"{scheme}://{host}{path}". The path keeps any port, query
+    and fragment; userinfo or bracketed hosts are kept in the host as-is.
+    """
+    scheme, _, remainder = url.partition("://")
+
+    end = len(remainder)
+    for sep in "/?#":
+        idx = remainder.find(sep)
+        if idx != -1 and idx < end:
+            end = idx
+    host = remainder[:end]
+
+    if "@" not in host and not host.startswith("["):
+        host = host.split(":", 1)[0]
+
+    return scheme, host, remainder[len(host):]
+
+
+def classify_indicator(value: str, rejected: dict | None = None) -> tuple[str, str] | None:
+    """
+    Classify a single raw IOC string and normalize it.
+    Returns (kind, normalized_value) where kind is "ips", "urls" or "domains",
+    or None if the value is empty or a domain without a real public suffix
+    (counted per reason in `rejected` if given).
+    """
+    value = value.strip()
+    if not value:
+        return None
+
+    if is_ip(value):
+        return "ips", normalize_ip(value)
+
+    if is_url(refang(value.lower())):
+        return "urls", normalize_url(value)
+
+    domain = normalize_domain(value)
+    reason = check_domain(domain)
+    if reason is not None:
+        if rejected is not None:
+            rejected[reason] = rejected.get(reason, 0) + 1
+        return None
+    return "domains", domain
+
+
+def normalize_domains(domains, rejected: dict | None = None) -> list:
+    """Normalize domains and drop those without a real public suffix (counted in `rejected`)."""
+    return filter_domains({normalize_domain(domain) for domain in domains}, rejected)
+
+
+def normalize_indicators(indicators: dict, rejected: dict | None = None):
     normalized = {
         "urls": set(),
-        "domains": set(),
         "ips": set()
     }
 
     for url in indicators.get("urls", []):
         normalized["urls"].add(normalize_url(url))
 
-    for domain in indicators.get("domains", []):
-        normalized["domains"].add(normalize_domain(domain))
-
     for ip in indicators.get("ips", []):
         normalized["ips"].add(normalize_ip(ip))
 
     return {
         "urls": list(normalized["urls"]),
-        "domains": list(normalized["domains"]),
+        "domains": normalize_domains(indicators.get("domains", []), rejected),
         "ips": list(normalized["ips"])
     }
@@ -0,0 +1,201 @@
+"""
+providers.py — Registry of enrichment providers, loaded lazily on first use.
+
+Each provider implements the small Provider interface below. The registry
+only stores "module:attribute" specs; nothing is imported until
+get_provider() is first called for that name, so processes that never
+enrich (e.g. lookups through enrichment.py) do not pay for the API clients
+or need the Malicious-Check checkout to exist.
+
+Where providers come from, later entries winning:
+    1. BUILTIN_PROVIDERS — the Malicious-Check API clients
+    2. entry points in the "ioc_pipeline.providers" group
+    3. the IOC_PROVIDERS environment variable:
+         IOC_PROVIDERS=fake                          all built-in names → offline fakes
+         IOC_PROVIDERS=ipinfo=my_pkg.geo:GeoProvider  override single names (comma-separated)
+"""
+
+import importlib
+import os
+import sys
+
+# The Malicious-Check project holding the real API clients
+SCANNER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "Zeronsec", "Gunjan_Repo", "Malicious-Check"))
+
+ENTRY_POINT_GROUP = "ioc_pipeline.providers"
+
+BUILTIN_PROVIDERS = {
+    "virustotal": "providers:VirusTotalProvider",
+    "ipinfo": "providers:IPInfoProvider",
+    "abuseipdb": "providers:AbuseIPDBProvider",
+}
+
+FAKE_PROVIDERS = {
+    "virustotal": "fake_providers:FakeVirusTotal",
+    "ipinfo": "fake_providers:FakeIPInfo",
+    "abuseipdb": "fake_providers:FakeAbuseIPDB",
+}
+
+
+class ProviderError(RuntimeError):
+    """A provider could not be found or loaded."""
+
+
+class Provider:
+    """
+    Common interface for enrichment providers. Every method may return
+    None / [] when the provider has nothing for that indicator.
+    """
+
+    name = ""
+
+    def search_ip(self, ip_address: str) -> dict | None:
+        return None
+
+    def search_domain(self, domain: str) -> dict | None:
+        return None
+
+    def domain_resolutions(self, domain: str) -> list[dict]:
+        """Passive DNS for a domain as [{"ip_address": ...}, ...]."""
+        return []
+
+
+# ==================== SCANNER-BACKED PROVIDERS ====================
+
+def _import_scanner_client(module_name: str):
+    if SCANNER_DIR not in sys.path:
+        sys.path.insert(0, SCANNER_DIR)
+    try:
+        return importlib.import_module(module_name)
+    except ImportError as e:
+        raise ProviderError(
+            f"Cannot import {module_name} from {SCANNER_DIR} ({e}). "
+            f"Check out Malicious-Check there or set IOC_PROVIDERS."
+        ) from e
+
+
+class VirusTotalProvider(Provider):
+    name = "virustotal"
+
+    def __init__(self):
+        self.client = _import_scanner_client("virustotal_client")
+
+    def search_ip(self, ip_address: str) -> dict | None:
+        data = self.client.search_ip(ip_address)
+        if data:
+            # Also grab relationships
+            data["resolutions"] = self.client.get_ip_resolutions(ip_address) or []
+            data["communicating_files"] = self.client.get_ip_communicating_files(ip_address) or []
+        return data
+
+    def search_domain(self, domain: str) -> dict | None:
+        data = self.client.search_domain(domain)
+        if data:
+            # Also grab subdomains and communicating files
+            data["subdomains"] = self.client.get_domain_subdomains(domain) or []
+            data["communicating_files"] = self.client.get_domain_communicating_files(domain) or []
+        return data
+
+    def domain_resolutions(self, domain: str) -> list[dict]:
+        return self.client.get_domain_resolutions(domain) or []
+
+
+class IPInfoProvider(Provider):
+    name = "ipinfo"
+
+    def __init__(self):
+        self.client = _import_scanner_client("ipinfo_client")
+
+    def search_ip(self, ip_address: str) -> dict | None:
+        return self.client.search_ip(ip_address)
+
+
+class AbuseIPDBProvider(Provider):
+    name = "abuseipdb"
+
+    def __init__(self):
+        self.client = _import_scanner_client("abuseipdb_client")
+
+    def search_ip(self, ip_address: str) -> dict | None:
+        return self.client.search_ip(ip_address)
+
+
+# ==================== REGISTRY ====================
+
+_specs = None
+_instances = {}
+
+
+def _parse_env(value: str) -> dict:
+    value = value.strip()
+    if not value:
+        return {}
+    if value == "fake":
+        return dict(FAKE_PROVIDERS)
+
+    specs = {}
+    for item in value.split(","):
+        name, _, spec = item.partition("=")
+        if not spec:
+            raise ProviderError(f"IOC_PROVIDERS entry {item!r} must look like name=module:attr")
+        specs[name.strip()] = spec.strip()
+    return specs
+
+
+def _load_specs() -> dict:
+    specs = dict(BUILTIN_PROVIDERS)
+
+    # importlib.metadata is only imported when resolving the registry
+    from importlib.metadata import entry_points
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        specs[entry_point.name] = entry_point.value
+
+    specs.update(_parse_env(os.environ.get("IOC_PROVIDERS", "")))
+    return specs
+
+
+def register_provider(name: str, spec):
+    """Register a "module:attr" spec, a Provider class/factory, or an instance under name."""
+    global _specs
+    if _specs is None:
+        _specs = _load_specs()
+    _specs[name] = spec
+    _instances.pop(name, None)
+
+
+def available_providers() -> list[str]:
+    global _specs
+    if _specs is None:
+        _specs = _load_specs()
+    return sorted(_specs)
+
+
+def get_provider(name: str) -> Provider:
+    """Return the provider registered under name, importing it on first use."""
+    if name in _instances:
+        return _instances[name]
+
+    global _specs
+    if _specs is None:
+        _specs = _load_specs()
+    if name not in _specs:
+        raise ProviderError(f"No enrichment provider registered as {name!r}")
+
+    spec = _specs[name]
+    if isinstance(spec, str):
+        module_name, _, attr = spec.partition(":")
+        try:
+            spec = getattr(importlib.import_module(module_name), attr)
+        except (ImportError, AttributeError) as e:
+            raise ProviderError(f"Cannot load provider {name!r} from {_specs[name]!r}: {e}") from e
+
+    provider = spec() if callable(spec) else spec
+    _instances[name] = provider
+    return provider
+
+
+def reset_providers():
+    """Forget loaded providers and re-read entry points / IOC_PROVIDERS on next use."""
+    global _specs
+    _specs = None
+    _instances.clear()
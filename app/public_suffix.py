@@ -0,0 +1,198 @@
+"""
+public_suffix.py — Reject domain candidates that do not end in a real public suffix.
+
+DOMAIN_REGEX matches anything shaped like label.tld, so file names
+(payload.exe, readme.txt) and object paths from HTML/JSON feeds look like
+domains. A candidate is kept only if it has at least one label in front of
+an ICANN public suffix from the bundled Mozilla list (db/public_suffix_list.dat;
+the PRIVATE section is skipped so hosting-provider names like github.io
+stay valid indicators). The list is compiled once into a reversed-label
+trie and cached with marshal next to it; the cache is rebuilt whenever
+the list file changes.
+
+To update the list, replace db/public_suffix_list.dat with a fresh copy of
+https://publicsuffix.org/list/public_suffix_list.dat.
+
+Usage:
+    python app/public_suffix.py --compile          # rebuild the cache
+    python app/public_suffix.py <domain> [...]     # check candidates
+"""
+
+import argparse
+import marshal
+import os
+import tempfile
+from pathlib import Path
+
+SUFFIX_LIST_PATH = Path("db/public_suffix_list.dat")
+CACHE_PATH = Path("db/public_suffix.cache")
+CACHE_VERSION = 1
+
+# Trie node keys: child labels, "*" for wildcard rules, "!label" for
+# exception rules, and END when a rule ends at this node
+END = ""
+
+REJECT_UNKNOWN_SUFFIX = "unknown_suffix"
+REJECT_BARE_SUFFIX = "bare_suffix"
+
+_trie = None
+
+
+# ==================== COMPILE / CACHE ====================
+
+def _rule_variants(rule: str) -> list[str]:
+    """The rule as listed plus its punycode form for IDN rules."""
+    variants = [rule]
+    if not rule.isascii():
+        try:
+            variants.append(".".join(
+                label if label in ("*", "") else label.encode("idna").decode("ascii")
+                for label in rule.split(".")
+            ))
+        except UnicodeError:
+            pass
+    return variants
+
+
+def compile_suffix_list(path: Path = SUFFIX_LIST_PATH) -> dict:
+    """Parse the ICANN section of a public suffix list into a nested-dict trie."""
+    trie = {}
+    in_icann = False
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("// ===BEGIN ICANN DOMAINS==="):
+                in_icann = True
+                continue
+            if line.startswith("// ===END ICANN DOMAINS==="):
+                break
+            if not in_icann or not line or line.startswith("//"):
+                continue
+
+            rule = line.split()[0].lower()
+            exception = rule.startswith("!")
+            for variant in _rule_variants(rule.lstrip("!")):
+                labels = variant.split(".")[::-1]
+                node = trie
+                for label in labels[:-1]:
+                    node = node.setdefault(label, {})
+                if exception:
+                    node["!" + labels[-1]] = 1
+                else:
+                    node.setdefault(labels[-1], {})[END] = 1
+
+    return trie
+
+
+def _stamp(path: Path) -> tuple:
+    stat = path.stat()
+    return (CACHE_VERSION, stat.st_size, stat.st_mtime_ns)
+
+
+def load_suffix_trie(path: Path = SUFFIX_LIST_PATH, cache_path: Path = CACHE_PATH, rebuild: bool = False) -> dict:
+    """Load the compiled trie from cache, recompiling when the list file changed."""
+    stamp = _stamp(path)
+
+    if not rebuild and cache_path.exists():
+        try:
+            with open(cache_path, "rb") as f:
+                cached_stamp, trie = marshal.load(f)
+            if tuple(cached_stamp) == stamp:
+                return trie
+        except (EOFError, ValueError, TypeError):
+            pass
+
+    trie = compile_suffix_list(path)
+
+    # Per-process temp file: extraction workers may all rebuild at once
+    tmp = None
+    try:
+        with tempfile.NamedTemporaryFile(dir=cache_path.parent, prefix=cache_path.name + ".",
+                                         suffix=".tmp", delete=False) as f:
+            tmp = f.name
+            marshal.dump((stamp, trie), f)
+        os.replace(tmp, cache_path)
+    except OSError as e:
+        # Read-only db/ or similar: keep the compiled trie in memory only
+        print(f"⚠️  Could not write {cache_path}: {e}")
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+    return trie
+
+
+def _get_trie() -> dict:
+    global _trie
+    if _trie is None:
+        _trie = load_suffix_trie()
+    return _trie
+
+
+# ==================== VALIDATION ====================
+
+def _match(node: dict, labels: list, i: int) -> int | None:
+    """
+    Number of labels[i:] covered by the longest rule continuing from node,
+    or None when no rule ends at or below node.
+    """
+    best = 0 if END in node else None
+    if i == len(labels):
+        return best
+
+    label = labels[i]
+    if "!" + label in node:
+        # Exception rule: the suffix ends at this node
+        return 0
+
+    for key in (label, "*"):
+        child = node.get(key)
+        if child is not None:
+            matched = _match(child, labels, i + 1)
+            if matched is not None and (best is None or matched + 1 > best):
+                best = matched + 1
+    return best
+
+
+def check_domain(domain: str) -> str | None:
+    """
+    Return None if domain is a plausible registrable name, otherwise the
+    rejection reason (REJECT_UNKNOWN_SUFFIX or REJECT_BARE_SUFFIX).
+    """
+    labels = domain.lower().rstrip(".").split(".")[::-1]
+    depth = _match(_get_trie(), labels, 0)
+    if not depth:
+        return REJECT_UNKNOWN_SUFFIX
+    if depth >= len(labels):
+        return REJECT_BARE_SUFFIX
+    return None
+
+
+def filter_domains(domains, rejected: dict | None = None) -> list:
+    """Keep valid domains; add per-reason rejection counts to `rejected` if given."""
+    kept = []
+    for domain in domains:
+        reason = check_domain(domain)
+        if reason is None:
+            kept.append(domain)
+        elif rejected is not None:
+            rejected[reason] = rejected.get(reason, 0) + 1
+    return kept
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compile the public suffix list or check domain candidates.")
+    parser.add_argument("domains", nargs="*", help="domain candidates to check")
+    parser.add_argument("--compile", action="store_true", help=f"rebuild {CACHE_PATH} from {SUFFIX_LIST_PATH}")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.compile:
+        trie = load_suffix_trie(rebuild=True)
+        print(f"✅ Compiled {len(trie)} top-level suffixes into {CACHE_PATH}")
+
+    for domain in args.domains:
+        reason = check_domain(domain)
+        print(f"  {'✅' if reason is None else '❌'} {domain}" + (f"  ({reason})" if reason else ""))
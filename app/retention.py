@@ -0,0 +1,350 @@
+"""
+retention.py — Age out stale indicators and enrichment cache entries.
+
+Indicators expire when no feed has listed them for longer than their TTL
+(last_seen is refreshed on every ingest). TTLs are set per IOC type and can
+be overridden per source. Expired rows are deleted — or moved to
+db/archive.db with --archive — in small batches, each in its own short
+transaction, so ingestion and lookups are never blocked for long. Free pages
+are then handed back to the filesystem with incremental vacuum.
+
+Policy file (optional, default db/retention.json):
+    {
+        "ttl_days": {"ip": 30, "domain": 90, "url": 30},
+        "enrichment_ttl_hours": 24,
+        "sources": {
+            "https://example.com/feed.txt": {"ip": 7}
+        }
+    }
+A TTL of 0 or null means "never expire". In sharded mode every shard is
+processed; sources and the enrichment cache stay in the main DB.
+
+Usage:
+    python app/retention.py [--config PATH] [--archive] [--batch-size N]
+    python app/retention.py --enable-incremental-vacuum
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from storage import DB_PATH, ioc_connections, init_db, decode_ip, table_exists
+
+DEFAULT_CONFIG_PATH = Path("db/retention.json")
+ARCHIVE_PATH = Path("db/archive.db")
+
+DEFAULT_POLICY = {
+    "ttl_days": {"ip": 30, "domain": 90, "url": 30},
+    "enrichment_ttl_hours": 24,
+    "sources": {},
+}
+
+DEFAULT_BATCH_SIZE = 2_000
+BATCH_PAUSE_SECONDS = 0.05
+VACUUM_STEP_PAGES = 2_000
+
+# Per IOC type: table, a SELECT yielding
+# (id, host_id, value, first_seen, last_seen, source_id),
+# the column that is aged, and an optional extra row condition
+EXPIRY_QUERIES = {
+    "ip": (
+        "ip_iocs",
+        "SELECT t.id, NULL, t.ip_key, t.first_seen, t.last_seen, t.source_id FROM ip_iocs t",
+        "last_seen",
+        None,
+    ),
+    "domain": (
+        "domain_iocs",
+        "SELECT t.id, t.host_id, h.host, t.first_seen, t.last_seen, t.source_id "
+        "FROM domain_iocs t JOIN hosts h ON h.id = t.host_id",
+        "last_seen",
+        None,
+    ),
+    "url": (
+        "url_iocs",
+        "SELECT t.id, t.host_id, t.scheme || '://' || h.host || t.path, t.first_seen, t.last_seen, t.source_id "
+        "FROM url_iocs t JOIN hosts h ON h.id = t.host_id",
+        "last_seen",
+        None,
+    ),
+}
+
+# Rows still in the pre-compact text tables until migrate.py --compact has
+# moved them; they have no last_seen, so they age from first_seen
+LEGACY_EXPIRY_QUERIES = {
+    "ip": (
+        "ip_iocs_legacy",
+        "SELECT t.id, NULL, t.ip_address, t.first_seen, t.first_seen, t.source_id FROM ip_iocs_legacy t",
+        "first_seen",
+        None,
+    ),
+    "domain": (
+        "domain_iocs_legacy",
+        "SELECT t.id, NULL, t.domain_or_url, t.first_seen, t.first_seen, t.source_id FROM domain_iocs_legacy t",
+        "first_seen",
+        "t.ioc_type = 'domain'",
+    ),
+    "url": (
+        "domain_iocs_legacy",
+        "SELECT t.id, NULL, t.domain_or_url, t.first_seen, t.first_seen, t.source_id FROM domain_iocs_legacy t",
+        "first_seen",
+        "t.ioc_type = 'url'",
+    ),
+}
+
+
+def load_policy(path: Path | None = None) -> dict:
+    """Merge the JSON policy file (if any) over DEFAULT_POLICY."""
+    policy = json.loads(json.dumps(DEFAULT_POLICY))
+    path = path or DEFAULT_CONFIG_PATH
+
+    if not path.exists():
+        return policy
+
+    with open(path, "r") as f:
+        overrides = json.load(f)
+
+    policy["ttl_days"].update(overrides.get("ttl_days", {}))
+    policy["sources"].update(overrides.get("sources", {}))
+    if "enrichment_ttl_hours" in overrides:
+        policy["enrichment_ttl_hours"] = overrides["enrichment_ttl_hours"]
+    return policy
+
+
+def _expiry_rules(source_urls: dict, policy: dict, ioc_type: str) -> list[tuple[str, tuple, int]]:
+    """
+    Turn the policy into (where_clause, params, ttl_days) rules for one IOC
+    type: one per overridden source, plus the default for everything else.
+    """
+    source_ids = {url: source_id for source_id, url in source_urls.items()}
+
+    rules = []
+    overridden = []
+    for source_url, ttls in policy["sources"].items():
+        source_id = source_ids.get(source_url)
+        if source_id is None or ioc_type not in ttls:
+            continue
+        overridden.append(source_id)
+        if ttls[ioc_type]:
+            rules.append(("t.source_id = ?", (source_id,), ttls[ioc_type]))
+
+    default_ttl = policy["ttl_days"].get(ioc_type)
+    if default_ttl:
+        placeholders = ", ".join("?" * len(overridden))
+        rules.append((f"(t.source_id IS NULL OR t.source_id NOT IN ({placeholders}))", tuple(overridden), default_ttl))
+
+    return rules
+
+
+def _ensure_archive(conn):
+    conn.execute("ATTACH DATABASE ? AS archive", (str(ARCHIVE_PATH),))
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS archive.archived_iocs (
+            id           INTEGER PRIMARY KEY AUTOINCREMENT,
+            ioc_type     TEXT NOT NULL,
+            ioc_value    TEXT NOT NULL,
+            first_seen   DATETIME,
+            last_seen    DATETIME,
+            source_url   TEXT,
+            archived_at  DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    conn.commit()
+
+
+def _expire_indicators(conn, ioc_type: str, rules: list, source_urls: dict, batch_size: int, archive: bool,
+                       queries: dict = EXPIRY_QUERIES) -> int:
+    table, select_sql, seen_column, condition = queries[ioc_type]
+    cursor = conn.cursor()
+
+    if condition:
+        rules = [(f"{condition} AND {where}", params, ttl_days) for where, params, ttl_days in rules]
+
+    removed = 0
+    for where, params, ttl_days in rules:
+        query = (
+            f"{select_sql} WHERE t.{seen_column} < datetime('now', ?) AND {where} "
+            f"ORDER BY t.{seen_column} LIMIT ?"
+        )
+        while True:
+            cursor.execute(query, (f"-{int(ttl_days)} days", *params, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            if archive:
+                cursor.executemany(
+                    """
+                    INSERT INTO archive.archived_iocs (ioc_type, ioc_value, first_seen, last_seen, source_url)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (
+                        (ioc_type, value if isinstance(value, str) else decode_ip(value),
+                         first_seen, last_seen, source_urls.get(source_id))
+                        for _, _, value, first_seen, last_seen, source_id in rows
+                    )
+                )
+
+            cursor.executemany(f"DELETE FROM {table} WHERE id = ?", ((row[0],) for row in rows))
+
+            # Drop hosts no longer referenced by any domain or URL
+            host_ids = {row[1] for row in rows if row[1] is not None}
+            cursor.executemany(
+                """
+                DELETE FROM hosts WHERE id = ?1
+                  AND NOT EXISTS (SELECT 1 FROM domain_iocs WHERE host_id = ?1)
+                  AND NOT EXISTS (SELECT 1 FROM url_iocs WHERE host_id = ?1)
+                """,
+                ((host_id,) for host_id in host_ids)
+            )
+
+            conn.commit()
+            removed += len(rows)
+
+            # Give other writers a chance to take the lock between batches
+            time.sleep(BATCH_PAUSE_SECONDS)
+
+    return removed
+
+
+def _expire_enrichments(conn, ttl_hours: int | None, batch_size: int) -> int:
+    if not ttl_hours:
+        return 0
+
+    cursor = conn.cursor()
+    removed = 0
+    while True:
+        cursor.execute(
+            """
+            DELETE FROM enrichment_results WHERE id IN (
+                SELECT id FROM enrichment_results
+                WHERE enriched_at < datetime('now', ?)
+                LIMIT ?
+            )
+            """,
+            (f"-{int(ttl_hours)} hours", batch_size)
+        )
+        conn.commit()
+        removed += cursor.rowcount
+        if cursor.rowcount < batch_size:
+            break
+        time.sleep(BATCH_PAUSE_SECONDS)
+
+    return removed
+
+
+def incremental_vacuum(conn) -> int | None:
+    """
+    Release free pages in bounded steps. Returns the number of pages freed,
+    or None when the database is not in incremental auto_vacuum mode.
+    """
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA auto_vacuum")
+    if cursor.fetchone()[0] != 2:
+        return None
+
+    freed = 0
+    cursor.execute("PRAGMA freelist_count")
+    free_pages = cursor.fetchone()[0]
+    while free_pages:
+        # execute() steps a PRAGMA once (one page); executescript runs it to completion
+        conn.executescript(f"PRAGMA incremental_vacuum({min(free_pages, VACUUM_STEP_PAGES)})")
+        cursor.execute("PRAGMA freelist_count")
+        remaining = cursor.fetchone()[0]
+        if remaining >= free_pages:
+            break
+        freed += free_pages - remaining
+        free_pages = remaining
+    return freed
+
+
+def enforce_retention(policy: dict, batch_size: int = DEFAULT_BATCH_SIZE, archive: bool = False) -> dict:
+    """
+    Expire indicators and cache entries per policy, in the main DB and every
+    shard. Returns removed counts.
+    """
+    connections = ioc_connections()
+    main = connections[0]
+
+    # Sources live in the main DB even when IOCs are sharded
+    source_urls = dict(main.execute("SELECT id, source_url FROM sources"))
+    rules = {ioc_type: _expiry_rules(source_urls, policy, ioc_type) for ioc_type in EXPIRY_QUERIES}
+
+    removed = {ioc_type: 0 for ioc_type in EXPIRY_QUERIES}
+    vacuumed = None
+    for conn in connections:
+        if archive:
+            _ensure_archive(conn)
+        for ioc_type in EXPIRY_QUERIES:
+            removed[ioc_type] += _expire_indicators(conn, ioc_type, rules[ioc_type], source_urls, batch_size, archive)
+            if table_exists(conn.cursor(), LEGACY_EXPIRY_QUERIES[ioc_type][0]):
+                removed[ioc_type] += _expire_indicators(
+                    conn, ioc_type, rules[ioc_type], source_urls, batch_size, archive, LEGACY_EXPIRY_QUERIES
+                )
+
+    removed["enrichment"] = _expire_enrichments(main, policy.get("enrichment_ttl_hours"), batch_size)
+
+    for conn in connections:
+        freed = incremental_vacuum(conn)
+        if freed is not None:
+            vacuumed = (vacuumed or 0) + freed
+        conn.close()
+
+    removed["vacuumed_pages"] = vacuumed
+    return removed
+
+
+def enable_incremental_vacuum():
+    """One-time switch of existing databases to auto_vacuum = INCREMENTAL (rewrites each file)."""
+    for conn in ioc_connections():
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        conn.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Expire stale IOCs and enrichment cache entries.")
+    parser.add_argument("--config", type=Path, help=f"retention policy JSON (default: {DEFAULT_CONFIG_PATH})")
+    parser.add_argument("--archive", action="store_true",
+                        help=f"copy expired indicators to {ARCHIVE_PATH} before deleting them")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"rows deleted per transaction (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="convert the database to incremental auto_vacuum (runs a full VACUUM once)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if not DB_PATH.exists():
+        print(f"❌ Database not found at {DB_PATH}")
+        raise SystemExit(1)
+
+    init_db()
+
+    if args.enable_incremental_vacuum:
+        print("Rewriting database with auto_vacuum = INCREMENTAL...")
+        enable_incremental_vacuum()
+        print("Done ✅")
+        raise SystemExit(0)
+
+    policy = load_policy(args.config)
+    started = time.monotonic()
+    removed = enforce_retention(policy, batch_size=args.batch_size, archive=args.archive)
+    elapsed = time.monotonic() - started
+
+    action = "Archived" if args.archive else "Deleted"
+    print(f"✅ Retention complete in {elapsed:.1f}s")
+    print(f"   {action} IPs:      {removed['ip']}")
+    print(f"   {action} domains:  {removed['domain']}")
+    print(f"   {action} URLs:     {removed['url']}")
+    print(f"   Stale cache entries removed: {removed['enrichment']}")
+    if removed["vacuumed_pages"] is None:
+        print("💡 Database is not in incremental auto_vacuum mode; freed pages stay in the file.")
+        print("   Run 'python app/retention.py --enable-incremental-vacuum' once to switch it.")
+    else:
+        print(f"   Pages returned by incremental vacuum: {removed['vacuumed_pages']}")
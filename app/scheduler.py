@@ -0,0 +1,302 @@
+"""
+scheduler.py — Long-running feed ingestion daemon.
+
+Replaces one cron-launched `main.py` process per feed. Feeds come from a
+registry file; each one is re-ingested on its own interval with random
+jitter, so feeds do not all fire at the top of the hour. A feed ingested
+within its cooldown (see storage.should_ingest_source) is not fetched again
+early, and a feed whose last run FAILED is retried with exponential backoff.
+Fetches run in a small thread pool capped globally and per host; parsing
+happens in the workers, while all DB writes go through one connection that
+stays open across cycles.
+
+Registry (default db/feeds.json):
+    {
+        "defaults": {"interval_minutes": 60, "jitter": 0.1, "cooldown_hours": 1},
+        "feeds": [
+            {"url": "https://example.com/feed.txt", "interval_minutes": 30},
+            {"url": "data/local_feed.txt"}
+        ]
+    }
+
+Usage:
+    python app/scheduler.py [--feeds PATH] [--max-workers N] [--per-host N] [--once]
+"""
+
+import argparse
+import heapq
+import json
+import os
+import random
+import signal
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+
+from fetcher import fetch_url, read_file
+from parallel_extract import extract_normalized
+from storage import get_connection, init_db, store_iocs, register_source, should_ingest_source
+
+DEFAULT_FEEDS_PATH = Path("db/feeds.json")
+DEFAULT_FEED_SETTINGS = {"interval_minutes": 60, "jitter": 0.1, "cooldown_hours": 1}
+
+BACKOFF_BASE_SECONDS = 60
+BACKOFF_MAX_SECONDS = 6 * 3600
+IDLE_POLL_SECONDS = 30
+
+
+class Feed:
+    """One registry entry plus its scheduling state."""
+
+    def __init__(self, entry: dict, defaults: dict):
+        settings = {**DEFAULT_FEED_SETTINGS, **defaults, **entry}
+        self.url = entry["url"]
+        self.interval = float(settings["interval_minutes"]) * 60
+        self.jitter = float(settings["jitter"])
+        self.cooldown_hours = float(settings["cooldown_hours"])
+        self.failures = 0
+        # Wall-clock times (epoch seconds) of the last successful ingest / last run
+        self.last_ingested = None
+        self.last_attempt = None
+
+        self.is_url = self.url.lower().startswith(("http://", "https://"))
+        if self.is_url:
+            self.label = self.url
+            self.host = urlparse(self.url).hostname or ""
+        else:
+            self.label = f"file://{os.path.abspath(self.url)}"
+            self.host = "localhost"
+
+    def cooldown_remaining(self) -> float:
+        """Seconds until the cooldown after the last successful ingest is over."""
+        if self.last_ingested is None:
+            return 0.0
+        return max(0.0, self.cooldown_hours * 3600 - (time.time() - self.last_ingested))
+
+    def next_delay(self) -> float:
+        """
+        Seconds until the next run: backoff after failures (counted from the
+        last attempt), else the interval with jitter but never inside the
+        cooldown.
+        """
+        jitter = random.uniform(1 - self.jitter, 1 + self.jitter)
+        if self.failures:
+            backoff = min(BACKOFF_BASE_SECONDS * 2 ** (self.failures - 1), BACKOFF_MAX_SECONDS) * jitter
+            since_attempt = time.time() - self.last_attempt if self.last_attempt else 0.0
+            return max(0.0, backoff - since_attempt)
+        return max(self.interval * jitter, self.cooldown_remaining())
+
+
+def _epoch(timestamp: str) -> float:
+    """sources.last_ingested (UTC, from CURRENT_TIMESTAMP) as epoch seconds."""
+    return datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp()
+
+
+def load_feeds(path: Path) -> list[Feed]:
+    with open(path, "r") as f:
+        registry = json.load(f)
+
+    defaults = registry.get("defaults", {})
+    return [Feed(entry, defaults) for entry in registry.get("feeds", [])]
+
+
+# ==================== WORKER ====================
+
+_thread_state = threading.local()
+
+
+def _session() -> requests.Session:
+    """One keep-alive session per worker thread (Session is not thread-safe)."""
+    if not hasattr(_thread_state, "session"):
+        _thread_state.session = requests.Session()
+    return _thread_state.session
+
+
+def _fetch_and_extract(feed: Feed) -> dict:
+    """Runs in a worker thread: fetch the feed and return normalized indicators."""
+    result = fetch_url(feed.url, session=_session()) if feed.is_url else read_file(feed.url)
+
+    if not result["success"]:
+        return {"success": False, "error": result["error"]}
+    if result.get("status_code", 200) >= 400:
+        return {"success": False, "error": f"HTTP {result['status_code']}"}
+
+    rejected = {}
+    iocs = extract_normalized(result["content"], rejected=rejected)
+    return {"success": True, "iocs": iocs, "rejected": sum(rejected.values())}
+
+
+# ==================== SCHEDULER ====================
+
+class Scheduler:
+    def __init__(self, feeds: list[Feed], max_workers: int = 4, per_host: int = 1):
+        self.feeds = feeds
+        self.max_workers = max_workers
+        self.per_host = per_host
+        # An Event rather than a flag: time.sleep resumes after SIGINT/SIGTERM
+        # (PEP 475), while waiting on the event returns as soon as stop() sets it
+        self._stopping = threading.Event()
+
+        self._queue = []  # (due_monotonic, seq, feed)
+        self._seq = 0
+        self._host_load = {}
+        self._running = {}
+
+    def _push(self, feed: Feed, delay: float):
+        self._seq += 1
+        heapq.heappush(self._queue, (time.monotonic() + delay, self._seq, feed))
+
+    def _initial_schedule(self, conn, once: bool):
+        """Spread first runs out, honouring each feed's cooldown and last status."""
+        cursor = conn.cursor()
+        for feed in self.feeds:
+            cursor.execute("SELECT last_ingested, last_status FROM sources WHERE source_url = ?", (feed.label,))
+            row = cursor.fetchone()
+            if row and row[0]:
+                feed.last_attempt = _epoch(row[0])
+                if row[1] == "FAILED":
+                    feed.failures = 1
+                else:
+                    feed.last_ingested = feed.last_attempt
+
+            in_cooldown = not feed.failures and not should_ingest_source(feed.label, feed.cooldown_hours)
+            if once:
+                if not in_cooldown:
+                    self._push(feed, 0)
+                continue
+
+            if feed.failures:
+                # Resume the backoff from the failed run instead of retrying at once
+                self._push(feed, feed.next_delay())
+                continue
+
+            delay = random.uniform(0, feed.interval * feed.jitter)
+            if in_cooldown:
+                elapsed = time.time() - feed.last_ingested
+                delay = max(delay, feed.interval - elapsed, feed.cooldown_remaining())
+            self._push(feed, delay)
+
+    def _dispatch_due(self, pool: ThreadPoolExecutor):
+        """Start every due feed that fits under the global and per-host caps."""
+        deferred = []
+        now = time.monotonic()
+
+        while self._queue and self._queue[0][0] <= now and len(self._running) < self.max_workers:
+            entry = heapq.heappop(self._queue)
+            feed = entry[2]
+            if self._host_load.get(feed.host, 0) >= self.per_host:
+                deferred.append(entry)
+                continue
+            self._host_load[feed.host] = self._host_load.get(feed.host, 0) + 1
+            self._running[pool.submit(_fetch_and_extract, feed)] = feed
+
+        for entry in deferred:
+            heapq.heappush(self._queue, entry)
+
+    def _finish(self, future, conn):
+        feed = self._running.pop(future)
+        self._host_load[feed.host] -= 1
+
+        try:
+            outcome = future.result()
+        except Exception as e:
+            outcome = {"success": False, "error": str(e)}
+
+        feed.last_attempt = time.time()
+
+        if outcome["success"]:
+            iocs = outcome["iocs"]
+            try:
+                store_iocs(iocs, feed.label, conn=conn)
+                register_source(feed.label, "OK", conn=conn)
+            except sqlite3.Error as e:
+                # e.g. "database is locked" while retention or sharding holds the writer
+                conn.rollback()
+                outcome = {"success": False, "error": f"storing failed: {e}"}
+            else:
+                feed.failures = 0
+                feed.last_ingested = feed.last_attempt
+                print(
+                    f"✅ {feed.label}: URLs: {len(iocs['urls'])}, "
+                    f"Domains: {len(iocs['domains'])}, IPs: {len(iocs['ips'])}, "
+                    f"rejected domain candidates: {outcome['rejected']}"
+                )
+
+        if not outcome["success"]:
+            feed.failures += 1
+            try:
+                register_source(feed.label, "FAILED", conn=conn)
+            except sqlite3.Error:
+                conn.rollback()
+            print(f"❌ {feed.label}: {outcome['error']} (failure #{feed.failures})")
+
+        return feed
+
+    def run(self, once: bool = False):
+        conn = get_connection()
+        self._initial_schedule(conn, once)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="feed") as pool:
+            while not self._stopping.is_set() and (self._queue or self._running):
+                self._dispatch_due(pool)
+
+                # Sleep until the next feed is due; if one is already due it is
+                # waiting on a concurrency cap, so wait for a running fetch instead
+                timeout = IDLE_POLL_SECONDS
+                if self._queue:
+                    until_due = self._queue[0][0] - time.monotonic()
+                    if until_due > 0:
+                        timeout = min(timeout, until_due)
+
+                if not self._running:
+                    self._stopping.wait(timeout)
+                    continue
+
+                done, _ = wait(list(self._running), timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    feed = self._finish(future, conn)
+                    if not once:
+                        self._push(feed, feed.next_delay())
+
+            # Let in-flight fetches land before shutting down
+            for future in list(self._running):
+                self._finish(future, conn)
+
+        conn.close()
+
+    def stop(self, *_):
+        print("Stopping after in-flight feeds finish...")
+        self._stopping.set()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the feed ingestion scheduler.")
+    parser.add_argument("--feeds", type=Path, default=DEFAULT_FEEDS_PATH,
+                        help=f"feed registry JSON (default: {DEFAULT_FEEDS_PATH})")
+    parser.add_argument("--max-workers", type=int, default=4, help="feeds fetched at once (default: 4)")
+    parser.add_argument("--per-host", type=int, default=1, help="feeds fetched at once per host (default: 1)")
+    parser.add_argument("--once", action="store_true", help="ingest every feed not in cooldown once, then exit")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if not args.feeds.exists():
+        print(f"❌ Feed registry not found at {args.feeds}")
+        raise SystemExit(1)
+
+    init_db()
+    feeds = load_feeds(args.feeds)
+    print(f"Scheduling {len(feeds)} feeds (max {args.max_workers} at once, {args.per_host} per host)")
+
+    scheduler = Scheduler(feeds, max_workers=args.max_workers, per_host=args.per_host)
+    signal.signal(signal.SIGINT, scheduler.stop)
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    scheduler.run(once=args.once)
@@ -0,0 +1,338 @@
+"""
+sharding.py — Optional multi-file storage so ingestion writers run in parallel.
+
+SQLite allows one writer per database file. In sharded mode IOCs are
+partitioned by type and hash across several files:
+    db/shards/ip_NN.db     IPs, by CRC32 of the encoded ip_key
+    db/shards/host_NN.db   domains and URLs, by CRC32 of the host — so a
+                           host's domain row and all its URLs share a shard
+and the writes for each shard are committed by separate worker processes.
+The main database keeps sources, the enrichment cache and any rows not yet
+moved to the shards. storage.py routes store_iocs, lookups and stats through
+this module, so callers do not change, except that lookups return no row
+id: ids are local to a shard and are reassigned whenever rows are moved
+(rebalance, merge). Sharded mode is on while db/shards/manifest.json
+exists; restart long-running processes after changing it.
+
+Usage:
+    python app/sharding.py --shards N    # enable, or rebalance to N shards per type
+    python app/sharding.py --merge       # move everything back into the main DB
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from normalizer import split_url
+import storage
+
+SHARD_DIR = storage.DB_PATH.parent / "shards"
+MANIFEST_NAME = "manifest.json"
+SHARD_KINDS = ("ip", "host")
+
+# Below this many indicators the batch is written inline; a process
+# round-trip costs more than it saves
+PARALLEL_MIN_INDICATORS = 5_000
+MOVE_BATCH_SIZE = 20_000
+
+_manifest = None
+_initialized = set()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# ==================== LAYOUT ====================
+
+def _read_manifest(shard_dir: Path = SHARD_DIR) -> dict | None:
+    path = shard_dir / MANIFEST_NAME
+    if not path.exists():
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def is_enabled() -> bool:
+    """True when a shard manifest exists (read once per process)."""
+    global _manifest
+    if _manifest is None:
+        _manifest = _read_manifest() or {}
+    return bool(_manifest)
+
+
+def shard_count() -> int:
+    return _manifest["shards"] if is_enabled() else 0
+
+
+def shard_path(kind: str, index: int, shard_dir: Path = SHARD_DIR) -> Path:
+    return shard_dir / f"{kind}_{index:02d}.db"
+
+
+def shard_paths(shard_dir: Path = SHARD_DIR, count: int | None = None) -> list[Path]:
+    count = shard_count() if count is None else count
+    return [shard_path(kind, i, shard_dir) for kind in SHARD_KINDS for i in range(count)]
+
+
+def shard_index(kind: str, key, count: int) -> int:
+    """Stable shard number for an encoded ip_key (kind "ip") or a host name (kind "host")."""
+    if kind == "ip":
+        data = key.to_bytes(4, "big") if isinstance(key, int) else bytes(key)
+    else:
+        data = key.encode("utf-8")
+    return zlib.crc32(data) % count
+
+
+def connect_shard(path: Path):
+    """Open a shard database, creating it with the IOC schema on first use."""
+    if path not in _initialized:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=60)
+    if path not in _initialized:
+        with open("db/schema.sql", "r") as f:
+            conn.executescript(f.read())
+        conn.commit()
+        _initialized.add(path)
+    return conn
+
+
+def connect_for(kind: str, key):
+    """Connection to the shard owning an ip_key or host."""
+    return connect_shard(shard_path(kind, shard_index(kind, key, shard_count())))
+
+
+# ==================== PARALLEL WRITES ====================
+
+def _write_shard(job: tuple) -> int:
+    """Worker: insert one shard's partition in a single transaction."""
+    path, batch, source_id = job
+    conn = connect_shard(Path(path))
+    storage.insert_indicators(conn.cursor(), batch, source_id)
+    conn.commit()
+    conn.close()
+    return sum(len(values) for values in batch.values())
+
+
+def _writer_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Never fork the (threaded) scheduler process; see parallel_extract._extract_pool
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=min(2 * shard_count(), os.cpu_count() or 1),
+                                        mp_context=multiprocessing.get_context(method))
+        return _pool
+
+
+def partition(iocs: dict, count: int, shard_dir: Path = SHARD_DIR) -> dict:
+    """Split {"ips", "domains", "urls"} into per-shard-file batches."""
+    partitions = {}
+
+    def batch_for(kind, key):
+        path = shard_path(kind, shard_index(kind, key, count), shard_dir)
+        if path not in partitions:
+            partitions[path] = {"ips": [], "domains": [], "urls": []}
+        return partitions[path]
+
+    for ip in iocs.get("ips", []):
+        ip_key = storage.encode_ip(ip)
+        if ip_key is not None:
+            batch_for("ip", ip_key)["ips"].append(ip)
+    for domain in iocs.get("domains", []):
+        batch_for("host", domain)["domains"].append(domain)
+    for url in iocs.get("urls", []):
+        batch_for("host", split_url(url)[1])["urls"].append(url)
+
+    return partitions
+
+
+def store_iocs(iocs: dict, source_id: int):
+    """Write a batch of IOCs to their shards, one writer process per shard file."""
+    jobs = [(str(path), batch, source_id) for path, batch in partition(iocs, shard_count()).items()]
+    total = sum(len(values) for values in iocs.values())
+
+    if len(jobs) < 2 or total < PARALLEL_MIN_INDICATORS:
+        for job in jobs:
+            _write_shard(job)
+        return
+
+    list(_writer_pool().map(_write_shard, jobs))
+
+
+# ==================== REBALANCE / MERGE ====================
+
+ROW_QUERIES = {
+    "ip": "SELECT t.id, t.ip_key, t.first_seen, t.last_seen, t.source_id FROM ip_iocs t",
+    "domain": (
+        "SELECT t.id, h.host, t.first_seen, t.last_seen, t.source_id "
+        "FROM domain_iocs t JOIN hosts h ON h.id = t.host_id"
+    ),
+    "url": (
+        "SELECT t.id, h.host, t.scheme, t.path, t.first_seen, t.last_seen, t.source_id "
+        "FROM url_iocs t JOIN hosts h ON h.id = t.host_id"
+    ),
+}
+ROW_TABLES = {"ip": "ip_iocs", "domain": "domain_iocs", "url": "url_iocs"}
+
+
+def _insert_rows(conn, ioc_type: str, rows: list):
+    """Insert moved rows keeping their timestamps and source."""
+    cursor = conn.cursor()
+    if ioc_type == "ip":
+        cursor.executemany(
+            "INSERT OR IGNORE INTO ip_iocs (ip_key, first_seen, last_seen, source_id) VALUES (?, ?, ?, ?)",
+            (row[1:] for row in rows)
+        )
+        return
+
+    cursor.executemany("INSERT OR IGNORE INTO hosts (host) VALUES (?)", ((row[1],) for row in rows))
+    if ioc_type == "domain":
+        cursor.executemany(
+            """
+            INSERT OR IGNORE INTO domain_iocs (host_id, first_seen, last_seen, source_id)
+            SELECT id, ?, ?, ? FROM hosts WHERE host = ?
+            """,
+            ((first_seen, last_seen, source_id, host) for _, host, first_seen, last_seen, source_id in rows)
+        )
+    else:
+        cursor.executemany(
+            """
+            INSERT OR IGNORE INTO url_iocs (host_id, scheme, path, first_seen, last_seen, source_id)
+            SELECT id, ?, ?, ?, ?, ? FROM hosts WHERE host = ?
+            """,
+            ((scheme, path, first_seen, last_seen, source_id, host)
+             for _, host, scheme, path, first_seen, last_seen, source_id in rows)
+        )
+
+
+def _drain(source_path: Path, route) -> int:
+    """
+    Move every IOC row out of source_path into the connection route(kind, key)
+    returns. Each batch is committed at the target before it is deleted at the
+    source, so an interrupted run can simply be repeated.
+    """
+    source = sqlite3.connect(source_path, timeout=60)
+    cursor = source.cursor()
+    moved = 0
+
+    for ioc_type, select_sql in ROW_QUERIES.items():
+        if not storage.table_exists(cursor, ROW_TABLES[ioc_type]):
+            continue
+        while True:
+            cursor.execute(f"{select_sql} ORDER BY t.id LIMIT ?", (MOVE_BATCH_SIZE,))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            kind = "ip" if ioc_type == "ip" else "host"
+            targets = {}
+            for row in rows:
+                targets.setdefault(route(kind, row[1]), []).append(row)
+            for target, target_rows in targets.items():
+                _insert_rows(target, ioc_type, target_rows)
+                target.commit()
+
+            cursor.executemany(f"DELETE FROM {ROW_TABLES[ioc_type]} WHERE id = ?", ((row[0],) for row in rows))
+            source.commit()
+            moved += len(rows)
+
+    if storage.table_exists(cursor, "hosts"):
+        cursor.execute(
+            """
+            DELETE FROM hosts WHERE NOT EXISTS (SELECT 1 FROM domain_iocs WHERE host_id = hosts.id)
+              AND NOT EXISTS (SELECT 1 FROM url_iocs WHERE host_id = hosts.id)
+            """
+        )
+        source.commit()
+    source.close()
+    return moved
+
+
+def _write_manifest(shard_dir: Path, count: int):
+    tmp = shard_dir / (MANIFEST_NAME + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump({"shards": count}, f)
+    os.replace(tmp, shard_dir / MANIFEST_NAME)
+
+
+def rebalance(count: int) -> int:
+    """
+    Spread all IOC rows (main DB and any existing shards) over `count`
+    shards per type. Rows are drained into a fresh shard set which then
+    replaces the old one. Returns the number of rows moved.
+    """
+    new_dir = SHARD_DIR.with_name(SHARD_DIR.name + ".new")
+    old = _read_manifest()
+    sources = [storage.DB_PATH] + (shard_paths(SHARD_DIR, old["shards"]) if old else [])
+
+    targets = {}
+
+    def route(kind, key):
+        path = shard_path(kind, shard_index(kind, key, count), new_dir)
+        if path not in targets:
+            targets[path] = connect_shard(path)
+        return targets[path]
+
+    moved = sum(_drain(path, route) for path in sources if path.exists())
+
+    # Create empty shards too, so every file in the layout exists
+    for path in shard_paths(new_dir, count):
+        if path not in targets:
+            targets[path] = connect_shard(path)
+    for conn in targets.values():
+        storage.rebuild_stats(conn)
+        conn.close()
+
+    _write_manifest(new_dir, count)
+    if SHARD_DIR.exists():
+        shutil.rmtree(SHARD_DIR)
+    os.replace(new_dir, SHARD_DIR)
+    storage.rebuild_stats()
+    return moved
+
+
+def merge() -> int:
+    """Move every shard's rows back into the main DB and leave sharded mode."""
+    old = _read_manifest()
+    if not old:
+        return 0
+
+    main = storage.get_connection()
+    moved = sum(_drain(path, lambda kind, key: main) for path in shard_paths(SHARD_DIR, old["shards"]) if path.exists())
+    storage.rebuild_stats(main)
+    main.close()
+
+    (SHARD_DIR / MANIFEST_NAME).unlink()
+    shutil.rmtree(SHARD_DIR)
+    return moved
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Manage sharded IOC storage.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--shards", type=int, help="enable sharding or rebalance to N shards per type")
+    group.add_argument("--merge", action="store_true", help="merge all shards back into the main DB")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    storage.init_db()
+    started = time.monotonic()
+
+    if args.merge:
+        moved = merge()
+        print(f"✅ Merged shards into {storage.DB_PATH}: {moved} rows moved in {time.monotonic() - started:.1f}s")
+    else:
+        if args.shards < 1:
+            print("❌ --shards must be at least 1")
+            raise SystemExit(1)
+        moved = rebalance(args.shards)
+        print(f"✅ {args.shards} shards per type in {SHARD_DIR}/: {moved} rows moved in {time.monotonic() - started:.1f}s")
@@ -0,0 +1,71 @@
+"""
+stats.py — IOC statistics from the incrementally maintained counters.
+
+Totals and breakdowns are read from the ioc_counters / ioc_daily_counts
+summary tables, so this stays fast no matter how large the IOC tables get.
+
+Usage:
+    python app/stats.py                  # totals + breakdown by type
+    python app/stats.py --by source      # breakdown by feed source
+    python app/stats.py --by day --type ip
+    python app/stats.py --rebuild        # reconcile counters with a full scan
+"""
+
+import argparse
+import sys
+import io
+
+from storage import DB_PATH, init_db, get_db_stats, get_stats_breakdown, rebuild_stats
+
+# Fix Windows console encoding for emoji/unicode
+if sys.platform == "win32":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
+
+
+def show(group_by: str, ioc_type: str | None):
+    stats = get_db_stats()
+
+    print("=" * 50)
+    print("  IOC TOTALS")
+    print("=" * 50)
+    print(f"  IPs: {stats['ips']}  |  Domains: {stats['domains']}  |  URLs: {stats['urls']}")
+    print(f"  Cached enrichments: {stats['cached_enrichments']}")
+
+    print()
+    print("=" * 50)
+    print(f"  BY {group_by.upper()}")
+    print("=" * 50)
+    rows = get_stats_breakdown(group_by, ioc_type)
+    if not rows:
+        print("  (empty)")
+    for row in rows:
+        print(f"    {row[group_by]:<40} {row['ioc_type']:<7} {row['count']}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Show IOC statistics.")
+    parser.add_argument("--by", choices=["type", "source", "day"], default="type",
+                        help="breakdown to show (default: type)")
+    parser.add_argument("--type", choices=["ip", "domain", "url"], dest="ioc_type",
+                        help="only include one IOC type in the breakdown")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="recompute the counters from the IOC tables")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if not DB_PATH.exists():
+        print(f"❌ Database not found at {DB_PATH}")
+        sys.exit(1)
+
+    init_db()
+
+    if args.rebuild:
+        print("Rebuilding statistics from the IOC tables...")
+        rebuild_stats()
+        print("Statistics rebuilt ✅")
+        print()
+
+    show(args.by, args.ioc_type)
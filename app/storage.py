@@ -1,57 +1,315 @@
 import sqlite3
 import json
+import ipaddress
+import re
 from pathlib import Path
 from datetime import datetime, timedelta
 
+from normalizer import is_url, split_url
+
 DB_PATH = Path("db/raw_iocs.db")
 
+IPV4_PATTERN = re.compile(r"\d{1,3}(?:\.\d{1,3}){3}", re.ASCII)
+
+# Present only in sharded mode (see sharding.py)
+SHARD_MANIFEST = DB_PATH.parent / "shards" / "manifest.json"
+_sharded = None
+
 
 def get_connection():
     DB_PATH.parent.mkdir(exist_ok=True)
     return sqlite3.connect(DB_PATH)
 
 
+# Old text-keyed tables are renamed to these while migrate.py --compact
+# backfills them into the compact layout.
+LEGACY_TABLES = {
+    "ip_iocs": ("ip_iocs_legacy", "ip_address"),
+    "domain_iocs": ("domain_iocs_legacy", "domain_or_url"),
+}
+
+# Keep the stats right while the backfill drains the legacy tables: copied
+# rows are counted by the compact tables' insert triggers, and these take
+# them off again when the backfill deletes them from the legacy table
+LEGACY_DELETE_TRIGGERS = {
+    "ip_iocs_legacy": "'ip'",
+    "domain_iocs_legacy": "OLD.ioc_type",
+}
+
+
+def _shards():
+    """The sharding module when sharded mode is on, else None (checked once per process)."""
+    global _sharded
+    if _sharded is None:
+        _sharded = SHARD_MANIFEST.exists()
+    if not _sharded:
+        return None
+    import sharding
+    return sharding
+
+
+def _lookup_connections(kind: str, key):
+    """
+    Connections to search for an ip_key (kind "ip") or host (kind "host"), in
+    order: its shard when sharded, then the main DB, which still holds rows
+    not moved to the shards yet and the *_legacy tables. Opened lazily.
+    """
+    shards = _shards()
+    if shards:
+        yield shards.connect_for(kind, key)
+    yield get_connection()
+
+
+def ioc_connections() -> list:
+    """Open connections to every database holding IOC rows: the main DB plus any shards."""
+    connections = [get_connection()]
+    shards = _shards()
+    if shards:
+        connections += [shards.connect_shard(path) for path in shards.shard_paths()]
+    return connections
+
+
 def init_db():
     conn = get_connection()
+    had_counters = table_exists(conn.cursor(), "ioc_counters")
+
+    _start_compact_migration(conn)
+    _add_last_seen_columns(conn)
+
     with open("db/schema.sql", "r") as f:
         conn.executescript(f.read())
     conn.commit()
+
+    _seed_compact_sequences(conn)
+    missing_triggers = _add_legacy_triggers(conn)
+
+    # Rows written before the counter triggers existed are not counted yet;
+    # legacy tables without their trigger were switched by an older version
+    # that reset the counters
+    if not had_counters or missing_triggers:
+        rebuild_stats(conn)
+
     conn.close()
 
 
-# ==================== STORE IOCs ====================
+def table_exists(cursor, table: str) -> bool:
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
 
-def store_iocs(iocs: dict, source_url: str):
-    """Store extracted IOCs into the appropriate tables (ip_iocs / domain_iocs)."""
-    conn = get_connection()
+
+def _has_column(cursor, table: str, column: str) -> bool:
+    cursor.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cursor.fetchall())
+
+
+def _start_compact_migration(conn):
+    """
+    Move text-keyed ip_iocs / domain_iocs tables out of the way so the
+    compact layout can be created in their place. Renaming is instant;
+    lookups fall back to the *_legacy tables until the backfill has
+    drained them (python app/migrate.py --compact).
+    """
     cursor = conn.cursor()
+    renamed = []
+
+    for table, (legacy, text_column) in LEGACY_TABLES.items():
+        if not table_exists(cursor, table) or not _has_column(cursor, table, text_column):
+            continue
+        # The stat triggers follow a renamed table; drop them so the
+        # compact tables get their own from schema.sql
+        cursor.execute(f"DROP TRIGGER IF EXISTS {table}_count_insert")
+        cursor.execute(f"DROP TRIGGER IF EXISTS {table}_count_delete")
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+        renamed.append(table)
+
+    if not renamed:
+        return
+
+    # The counters still include the legacy rows, which stay counted until
+    # the backfill moves them
+    _add_legacy_triggers(conn)
+    conn.commit()
 
-    # Get or create the source ID
-    source_id = _get_or_create_source(cursor, source_url)
+    print(f"⚠️  Legacy text layout found for {', '.join(renamed)} — switched to the compact tables.")
+    print("   Run 'python app/migrate.py --compact' to backfill the existing rows.")
 
-    # Store IPs in ip_iocs table
-    for ip in iocs.get("ips", []):
-        cursor.execute(
-            "INSERT OR IGNORE INTO ip_iocs (ip_address, source_id) VALUES (?, ?)",
-            (ip, source_id)
-        )
 
-    # Store Domains in domain_iocs table
-    for domain in iocs.get("domains", []):
+def _add_legacy_triggers(conn) -> bool:
+    """Create the delete triggers on *_legacy tables; True if any were missing."""
+    cursor = conn.cursor()
+    created = False
+
+    for legacy, ioc_type in LEGACY_DELETE_TRIGGERS.items():
+        if not table_exists(cursor, legacy):
+            continue
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (f"{legacy}_count_delete",))
+        if cursor.fetchone():
+            continue
         cursor.execute(
-            "INSERT OR IGNORE INTO domain_iocs (domain_or_url, ioc_type, source_id) VALUES (?, 'domain', ?)",
-            (domain, source_id)
+            f"""
+            CREATE TRIGGER {legacy}_count_delete AFTER DELETE ON {legacy}
+            BEGIN
+                UPDATE ioc_counters SET total = total - 1 WHERE ioc_type = {ioc_type};
+                UPDATE ioc_daily_counts SET total = total - 1
+                WHERE ioc_type = {ioc_type}
+                  AND source_id = COALESCE(OLD.source_id, 0)
+                  AND day = COALESCE(date(OLD.first_seen), date('now'));
+            END
+            """
         )
+        created = True
+
+    conn.commit()
+    return created
+
+
+def _add_last_seen_columns(conn):
+    """
+    Add last_seen to IOC tables created before it existed, starting it at
+    first_seen. ALTER TABLE cannot add a CURRENT_TIMESTAMP default, so
+    inserts always set last_seen explicitly.
+    """
+    cursor = conn.cursor()
+
+    for table in ("ip_iocs", "domain_iocs", "url_iocs"):
+        if not table_exists(cursor, table) or _has_column(cursor, table, "last_seen"):
+            continue
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN last_seen DATETIME")
+        cursor.execute(f"UPDATE {table} SET last_seen = first_seen")
+
+    conn.commit()
+
 
-    # Store URLs in domain_iocs table
-    for url in iocs.get("urls", []):
+def _seed_compact_sequences(conn):
+    """
+    Start the compact tables' AUTOINCREMENT above the legacy ids, so the
+    backfill can keep each row's original id without colliding with rows
+    ingested in the meantime.
+    """
+    cursor = conn.cursor()
+    targets = {"ip_iocs": "ip_iocs_legacy", "domain_iocs": "domain_iocs_legacy", "url_iocs": "domain_iocs_legacy"}
+
+    for table, legacy in targets.items():
+        if not table_exists(cursor, legacy):
+            continue
+        cursor.execute("SELECT 1 FROM sqlite_sequence WHERE name = ?", (table,))
+        if cursor.fetchone():
+            continue
         cursor.execute(
-            "INSERT OR IGNORE INTO domain_iocs (domain_or_url, ioc_type, source_id) VALUES (?, 'url', ?)",
-            (url, source_id)
+            f"INSERT INTO sqlite_sequence (name, seq) SELECT ?, COALESCE(MAX(id), 0) FROM {legacy}",
+            (table,)
         )
 
     conn.commit()
-    conn.close()
+
+
+# ==================== COMPACT ENCODING ====================
+
+def encode_ip(ip_address: str) -> int | bytes | None:
+    """
+    Encode an IP for the ip_iocs.ip_key column: IPv4 as a 32-bit integer,
+    IPv6 as 16 packed bytes. Returns None for invalid addresses.
+    """
+    if IPV4_PATTERN.fullmatch(ip_address):
+        key = 0
+        for part in ip_address.split("."):
+            octet = int(part)
+            if octet > 255:
+                return None
+            key = (key << 8) | octet
+        return key
+
+    # Anything else, including IPv6 with an embedded IPv4 tail (::ffff:1.2.3.4)
+    try:
+        return ipaddress.IPv6Address(ip_address).packed
+    except ValueError:
+        return None
+
+
+def decode_ip(ip_key: int | bytes) -> str:
+    """Turn an ip_key back into its text form."""
+    if isinstance(ip_key, int):
+        return f"{ip_key >> 24}.{(ip_key >> 16) & 255}.{(ip_key >> 8) & 255}.{ip_key & 255}"
+    address = ipaddress.IPv6Address(bytes(ip_key))
+    if address.ipv4_mapped:
+        return f"::ffff:{address.ipv4_mapped}"
+    return str(address)
+
+
+# ==================== STORE IOCs ====================
+
+def store_iocs(iocs: dict, source_url: str, conn=None):
+    """
+    Store extracted IOCs into the appropriate tables (ip_iocs / domain_iocs / url_iocs).
+    Pass an open connection to reuse it; otherwise one is opened and closed.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cursor = conn.cursor()
+
+    # Get or create the source ID
+    source_id = _get_or_create_source(cursor, source_url)
+
+    shards = _shards()
+    if shards:
+        conn.commit()
+        shards.store_iocs(iocs, source_id)
+    else:
+        insert_indicators(cursor, iocs, source_id)
+
+    conn.commit()
+    if own_conn:
+        conn.close()
+
+
+def insert_indicators(cursor, iocs: dict, source_id: int | None = None):
+    """
+    Bulk-insert a batch of classified IOCs ({"ips", "domains", "urls"}) using
+    the given cursor. Indicators already stored get their last_seen refreshed
+    and unparseable IPs are skipped; committing is left to the caller so
+    several batches can share one transaction.
+    """
+    # Store IPs in ip_iocs table
+    ip_keys = (encode_ip(ip) for ip in iocs.get("ips", []))
+    cursor.executemany(
+        """
+        INSERT INTO ip_iocs (ip_key, source_id, last_seen) VALUES (?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(ip_key) DO UPDATE SET last_seen = excluded.last_seen
+        """,
+        ((key, source_id) for key in ip_keys if key is not None)
+    )
+
+    domains = iocs.get("domains", [])
+    urls = [split_url(url) for url in iocs.get("urls", [])]
+
+    # Intern every host once, then reference it by id
+    hosts = set(domains)
+    hosts.update(host for _, host, _ in urls)
+    cursor.executemany(
+        "INSERT OR IGNORE INTO hosts (host) VALUES (?)",
+        ((host,) for host in hosts)
+    )
+
+    # Store Domains in domain_iocs table
+    cursor.executemany(
+        """
+        INSERT INTO domain_iocs (host_id, source_id, last_seen)
+        SELECT id, ?, CURRENT_TIMESTAMP FROM hosts WHERE host = ?
+        ON CONFLICT(host_id) DO UPDATE SET last_seen = excluded.last_seen
+        """,
+        ((source_id, domain) for domain in domains)
+    )
+
+    # Store URLs in url_iocs table
+    cursor.executemany(
+        """
+        INSERT INTO url_iocs (host_id, scheme, path, source_id, last_seen)
+        SELECT id, ?, ?, ?, CURRENT_TIMESTAMP FROM hosts WHERE host = ?
+        ON CONFLICT(host_id, scheme, path) DO UPDATE SET last_seen = excluded.last_seen
+        """,
+        ((scheme, path, source_id, host) for scheme, host, path in urls)
+    )
 
 
 def _get_or_create_source(cursor, source_url: str) -> int:
@@ -71,50 +329,125 @@ def _get_or_create_source(cursor, source_url: str) -> int:
 # ==================== LOOKUP IOCs ====================
 
 def lookup_ip(ip_address: str) -> dict | None:
-    """Check if an IP exists in the ip_iocs table. Returns row dict or None."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    """
+    Check if an IP exists in the ip_iocs table. Returns row dict or None.
+    In sharded mode the dict has no "id": row ids are local to a shard.
+    """
+    ip_key = encode_ip(ip_address.strip())
+    if ip_key is None:
+        return None
 
-    cursor.execute(
-        "SELECT id, ip_address, first_seen, source_id FROM ip_iocs WHERE ip_address = ?",
-        (ip_address,)
-    )
-    row = cursor.fetchone()
-    conn.close()
+    row = None
+    for conn in _lookup_connections("ip", ip_key):
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id, ip_key, first_seen, source_id FROM ip_iocs WHERE ip_key = ?",
+            (ip_key,)
+        )
+        row = cursor.fetchone()
+
+        if not row and table_exists(cursor, "ip_iocs_legacy"):
+            cursor.execute(
+                "SELECT id, ip_address, first_seen, source_id FROM ip_iocs_legacy WHERE ip_address = ?",
+                (ip_address,)
+            )
+            row = cursor.fetchone()
+        conn.close()
+        if row:
+            break
 
     if not row:
         return None
 
-    return {
+    return _without_shard_id({
         "id": row[0],
-        "ip_address": row[1],
+        "ip_address": decode_ip(row[1]) if not isinstance(row[1], str) else row[1],
         "first_seen": row[2],
         "source_id": row[3],
-    }
+    })
 
 
 def lookup_domain(domain_or_url: str) -> dict | None:
-    """Check if a domain/URL exists in the domain_iocs table. Returns row dict or None."""
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "SELECT id, domain_or_url, ioc_type, first_seen, source_id FROM domain_iocs WHERE domain_or_url = ?",
-        (domain_or_url,)
-    )
-    row = cursor.fetchone()
-    conn.close()
+    """
+    Check if a domain/URL exists in domain_iocs / url_iocs. Returns row dict or None.
+    In sharded mode the dict has no "id": row ids are local to a shard.
+    """
+    if is_url(domain_or_url):
+        scheme, host, path = split_url(domain_or_url)
+        query = """
+            SELECT u.id, 'url', u.first_seen, u.source_id
+            FROM url_iocs u JOIN hosts h ON h.id = u.host_id
+            WHERE h.host = ? AND u.scheme = ? AND u.path = ?
+        """
+        params = (host, scheme, path)
+    else:
+        host = domain_or_url
+        query = """
+            SELECT d.id, 'domain', d.first_seen, d.source_id
+            FROM domain_iocs d JOIN hosts h ON h.id = d.host_id
+            WHERE h.host = ?
+        """
+        params = (host,)
+
+    row = None
+    for conn in _lookup_connections("host", host):
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        row = cursor.fetchone()
+
+        if not row and table_exists(cursor, "domain_iocs_legacy"):
+            cursor.execute(
+                "SELECT id, ioc_type, first_seen, source_id FROM domain_iocs_legacy WHERE domain_or_url = ?",
+                (domain_or_url,)
+            )
+            row = cursor.fetchone()
+        conn.close()
+        if row:
+            break
 
     if not row:
         return None
 
-    return {
+    return _without_shard_id({
         "id": row[0],
-        "domain_or_url": row[1],
-        "ioc_type": row[2],
-        "first_seen": row[3],
-        "source_id": row[4],
-    }
+        "domain_or_url": domain_or_url,
+        "ioc_type": row[1],
+        "first_seen": row[2],
+        "source_id": row[3],
+    })
+
+
+def _without_shard_id(result: dict) -> dict:
+    """
+    Drop the row id in sharded mode: ids are only unique within one shard and
+    every rebalance renumbers the rows it moves, so callers must not keep them.
+    """
+    if _shards():
+        del result["id"]
+    return result
+
+
+def lookup_host_urls(host: str, limit: int = 100) -> list[str]:
+    """Return known malicious URLs on a host (a host-level join via hosts.id)."""
+    rows = []
+    for conn in _lookup_connections("host", host):
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT u.scheme, u.path
+            FROM hosts h JOIN url_iocs u ON u.host_id = h.id
+            WHERE h.host = ?
+            ORDER BY u.id
+            LIMIT ?
+            """,
+            (host, limit - len(rows))
+        )
+        rows += cursor.fetchall()
+        conn.close()
+        if len(rows) >= limit:
+            break
+
+    return [f"{scheme}://{host}{path}" for scheme, path in rows]
 
 
 # ==================== ENRICHMENT CACHE ====================
@@ -175,8 +508,10 @@ def get_cached_enrichment(ioc_value: str, api_source: str, max_age_hours: int =
 
 # ==================== SOURCE MANAGEMENT ====================
 
-def register_source(source_url: str, status: str):
-    conn = get_connection()
+def register_source(source_url: str, status: str, conn=None):
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
     cursor = conn.cursor()
 
     cursor.execute(
@@ -192,7 +527,8 @@ def register_source(source_url: str, status: str):
     )
 
     conn.commit()
-    conn.close()
+    if own_conn:
+        conn.close()
 
 
 def should_ingest_source(source_url: str, cooldown_hours: int = 24) -> bool:
@@ -220,29 +556,138 @@ def should_ingest_source(source_url: str, cooldown_hours: int = 24) -> bool:
 
 
 # ==================== STATS ====================
+# Counts are maintained by triggers (see db/schema.sql) as rows are
+# inserted or deleted, so reading them never scans the IOC tables.
 
 def get_db_stats() -> dict:
     """Get counts from both IOC tables for quick stats."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    totals = {}
+    for conn in ioc_connections():
+        for ioc_type, total in conn.execute("SELECT ioc_type, total FROM ioc_counters"):
+            totals[ioc_type] = totals.get(ioc_type, 0) + total
+        conn.close()
 
-    cursor.execute("SELECT COUNT(*) FROM ip_iocs")
-    ip_count = cursor.fetchone()[0]
+    return {
+        "ips": totals.get("ip", 0),
+        "domains": totals.get("domain", 0),
+        "urls": totals.get("url", 0),
+        "cached_enrichments": totals.get("enrichment", 0),
+    }
 
-    cursor.execute("SELECT COUNT(*) FROM domain_iocs WHERE ioc_type = 'domain'")
-    domain_count = cursor.fetchone()[0]
 
-    cursor.execute("SELECT COUNT(*) FROM domain_iocs WHERE ioc_type = 'url'")
-    url_count = cursor.fetchone()[0]
+def get_stats_breakdown(group_by: str = "type", ioc_type: str | None = None) -> list[dict]:
+    """
+    Break the live IOC counts down by "type", "source" or "day".
+    Reads only the ioc_daily_counts summary tables. Optionally filter to one
+    ioc_type ('ip', 'domain' or 'url').
+    """
+    columns = {"type": "ioc_type", "source": "source_id", "day": "day"}
+    if group_by not in columns:
+        raise ValueError(f"group_by must be one of {sorted(columns)}, got {group_by!r}")
+
+    query = f"""
+        SELECT {columns[group_by]}, ioc_type, SUM(total)
+        FROM ioc_daily_counts
+        WHERE total > 0 AND (? IS NULL OR ioc_type = ?)
+        GROUP BY 1, 2
+    """
 
-    cursor.execute("SELECT COUNT(*) FROM enrichment_results")
-    enrichment_count = cursor.fetchone()[0]
+    counts = {}
+    connections = ioc_connections()
+    for conn in connections:
+        for bucket, row_type, total in conn.execute(query, (ioc_type, ioc_type)):
+            counts[(bucket, row_type)] = counts.get((bucket, row_type), 0) + total
 
-    conn.close()
+    # Sources live in the main DB even when IOCs are sharded
+    source_urls = dict(connections[0].execute("SELECT id, source_url FROM sources"))
+    for conn in connections:
+        conn.close()
 
-    return {
-        "ips": ip_count,
-        "domains": domain_count,
-        "urls": url_count,
-        "cached_enrichments": enrichment_count,
-    }
\ No newline at end of file
+    rows = []
+    for (bucket, row_type), total in counts.items():
+        if group_by == "source":
+            bucket = source_urls.get(bucket, "(none)")
+        rows.append({group_by: bucket, "ioc_type": row_type, "count": total})
+    rows.sort(key=lambda row: (row[group_by], row["ioc_type"]))
+    return rows
+
+
+def rebuild_stats(conn=None):
+    """
+    Recompute ioc_counters and ioc_daily_counts from the IOC tables.
+    This is the only place that scans the full tables; use it to reconcile
+    the counters after manual edits or on databases created before them.
+    Without a connection, every IOC database (main and shards) is rebuilt.
+    """
+    if conn is None:
+        for conn in ioc_connections():
+            rebuild_stats(conn)
+            conn.close()
+        return
+
+    cursor = conn.cursor()
+
+    cursor.execute("DELETE FROM ioc_daily_counts")
+    cursor.execute(
+        """
+        INSERT INTO ioc_daily_counts (ioc_type, source_id, day, total)
+        SELECT 'ip', COALESCE(source_id, 0), COALESCE(date(first_seen), date('now')), COUNT(*)
+        FROM ip_iocs
+        GROUP BY 2, 3
+        """
+    )
+    cursor.execute(
+        """
+        INSERT INTO ioc_daily_counts (ioc_type, source_id, day, total)
+        SELECT 'domain', COALESCE(source_id, 0), COALESCE(date(first_seen), date('now')), COUNT(*)
+        FROM domain_iocs
+        GROUP BY 2, 3
+        """
+    )
+    cursor.execute(
+        """
+        INSERT INTO ioc_daily_counts (ioc_type, source_id, day, total)
+        SELECT 'url', COALESCE(source_id, 0), COALESCE(date(first_seen), date('now')), COUNT(*)
+        FROM url_iocs
+        GROUP BY 2, 3
+        """
+    )
+
+    # Rows still waiting in the pre-compact tables (see migrate.py --compact)
+    if table_exists(cursor, "ip_iocs_legacy"):
+        cursor.execute(
+            """
+            INSERT INTO ioc_daily_counts (ioc_type, source_id, day, total)
+            SELECT 'ip', COALESCE(source_id, 0), COALESCE(date(first_seen), date('now')), COUNT(*)
+            FROM ip_iocs_legacy
+            WHERE true
+            GROUP BY 2, 3
+            ON CONFLICT(ioc_type, source_id, day) DO UPDATE SET total = total + excluded.total
+            """
+        )
+    if table_exists(cursor, "domain_iocs_legacy"):
+        cursor.execute(
+            """
+            INSERT INTO ioc_daily_counts (ioc_type, source_id, day, total)
+            SELECT ioc_type, COALESCE(source_id, 0), COALESCE(date(first_seen), date('now')), COUNT(*)
+            FROM domain_iocs_legacy
+            WHERE true
+            GROUP BY 1, 2, 3
+            ON CONFLICT(ioc_type, source_id, day) DO UPDATE SET total = total + excluded.total
+            """
+        )
+
+    cursor.execute(
+        """
+        UPDATE ioc_counters SET total = (
+            SELECT COALESCE(SUM(total), 0) FROM ioc_daily_counts d
+            WHERE d.ioc_type = ioc_counters.ioc_type
+        )
+        WHERE ioc_type IN ('ip', 'domain', 'url')
+        """
+    )
+    cursor.execute(
+        "UPDATE ioc_counters SET total = (SELECT COUNT(*) FROM enrichment_results) WHERE ioc_type = 'enrichment'"
+    )
+
+    conn.commit()
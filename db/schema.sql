@@ -1,24 +1,76 @@
+-- Freed pages can be returned with PRAGMA incremental_vacuum
+-- (only takes effect when the database file is first created)
+PRAGMA auto_vacuum = INCREMENTAL;
+
 -- ============================================
 -- IP-based IOCs (from threat feeds)
+-- ip_key holds IPv4 as an INTEGER and IPv6 as a
+-- 16-byte BLOB (see storage.encode_ip), so the
+-- unique index stays small and sorts numerically.
 -- ============================================
 CREATE TABLE IF NOT EXISTS ip_iocs (
     id            INTEGER PRIMARY KEY AUTOINCREMENT,
-    ip_address    TEXT UNIQUE NOT NULL,
+    ip_key        INTEGER UNIQUE NOT NULL,
     first_seen    DATETIME DEFAULT CURRENT_TIMESTAMP,
+    last_seen     DATETIME DEFAULT CURRENT_TIMESTAMP,
     source_id     INTEGER REFERENCES sources(id)
 );
 
 -- ============================================
--- Domain/URL-based IOCs (from threat feeds)
+-- Interned host names
+-- Shared by domain_iocs and url_iocs so every URL
+-- stores its host once, as an integer reference.
+-- ============================================
+CREATE TABLE IF NOT EXISTS hosts (
+    id            INTEGER PRIMARY KEY,
+    host          TEXT UNIQUE NOT NULL
+);
+
+-- ============================================
+-- Domain IOCs (from threat feeds)
 -- ============================================
 CREATE TABLE IF NOT EXISTS domain_iocs (
     id            INTEGER PRIMARY KEY AUTOINCREMENT,
-    domain_or_url TEXT UNIQUE NOT NULL,
-    ioc_type      TEXT NOT NULL CHECK(ioc_type IN ('domain', 'url')),
+    host_id       INTEGER UNIQUE NOT NULL REFERENCES hosts(id),
     first_seen    DATETIME DEFAULT CURRENT_TIMESTAMP,
+    last_seen     DATETIME DEFAULT CURRENT_TIMESTAMP,
     source_id     INTEGER REFERENCES sources(id)
 );
 
+-- ============================================
+-- URL IOCs (from threat feeds)
+-- url = scheme || '://' || hosts.host || path
+-- ============================================
+CREATE TABLE IF NOT EXISTS url_iocs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    host_id       INTEGER NOT NULL REFERENCES hosts(id),
+    scheme        TEXT NOT NULL,
+    path          TEXT NOT NULL,
+    first_seen    DATETIME DEFAULT CURRENT_TIMESTAMP,
+    last_seen     DATETIME DEFAULT CURRENT_TIMESTAMP,
+    source_id     INTEGER REFERENCES sources(id),
+    UNIQUE(host_id, scheme, path)
+);
+
+-- ============================================
+-- last_seen is refreshed whenever a feed lists the
+-- indicator again; retention.py expires on it
+-- ============================================
+CREATE INDEX IF NOT EXISTS ip_iocs_last_seen ON ip_iocs(last_seen);
+CREATE INDEX IF NOT EXISTS domain_iocs_last_seen ON domain_iocs(last_seen);
+CREATE INDEX IF NOT EXISTS url_iocs_last_seen ON url_iocs(last_seen);
+
+-- ============================================
+-- Domains and URLs as text, in the shape of the
+-- old single domain_iocs table (for inspection)
+-- ============================================
+CREATE VIEW IF NOT EXISTS domain_url_iocs AS
+    SELECT d.id, h.host AS domain_or_url, 'domain' AS ioc_type, d.first_seen, d.source_id
+    FROM domain_iocs d JOIN hosts h ON h.id = d.host_id
+    UNION ALL
+    SELECT u.id, u.scheme || '://' || h.host || u.path, 'url', u.first_seen, u.source_id
+    FROM url_iocs u JOIN hosts h ON h.id = u.host_id;
+
 -- ============================================
 -- Enrichment cache (API results)
 -- Stores JSON responses from VT, IPInfo, AbuseIPDB
@@ -34,6 +86,8 @@ CREATE TABLE IF NOT EXISTS enrichment_results (
     UNIQUE(ioc_value, api_source)
 );
 
+CREATE INDEX IF NOT EXISTS enrichment_results_enriched_at ON enrichment_results(enriched_at);
+
 -- ============================================
 -- Feed sources (unchanged)
 -- ============================================
@@ -44,3 +98,122 @@ CREATE TABLE IF NOT EXISTS sources (
     last_ingested  DATETIME,
     last_status    TEXT
 );
+
+-- ============================================
+-- Incremental IOC statistics
+-- Kept up to date by the triggers below so stats
+-- never need a COUNT(*) scan over the IOC tables.
+-- ioc_counters holds one running total per type;
+-- ioc_daily_counts breaks the live rows down by
+-- type, source (0 = no source) and first_seen day
+-- (moved when a backfill merges an older sighting).
+-- ============================================
+CREATE TABLE IF NOT EXISTS ioc_counters (
+    ioc_type   TEXT PRIMARY KEY,
+    total      INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO ioc_counters (ioc_type, total) VALUES
+    ('ip', 0), ('domain', 0), ('url', 0), ('enrichment', 0);
+
+CREATE TABLE IF NOT EXISTS ioc_daily_counts (
+    ioc_type   TEXT NOT NULL,
+    source_id  INTEGER NOT NULL DEFAULT 0,
+    day        TEXT NOT NULL,
+    total      INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (ioc_type, source_id, day)
+);
+
+CREATE TRIGGER IF NOT EXISTS ip_iocs_count_insert AFTER INSERT ON ip_iocs
+BEGIN
+    UPDATE ioc_counters SET total = total + 1 WHERE ioc_type = 'ip';
+    INSERT INTO ioc_daily_counts (ioc_type, source_id, day, total)
+    VALUES ('ip', COALESCE(NEW.source_id, 0), COALESCE(date(NEW.first_seen), date('now')), 1)
+    ON CONFLICT(ioc_type, source_id, day) DO UPDATE SET total = total + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS ip_iocs_count_delete AFTER DELETE ON ip_iocs
+BEGIN
+    UPDATE ioc_counters SET total = total - 1 WHERE ioc_type = 'ip';
+    UPDATE ioc_daily_counts SET total = total - 1
+    WHERE ioc_type = 'ip'
+      AND source_id = COALESCE(OLD.source_id, 0)
+      AND day = COALESCE(date(OLD.first_seen), date('now'));
+END;
+
+CREATE TRIGGER IF NOT EXISTS ip_iocs_count_update AFTER UPDATE OF first_seen, source_id ON ip_iocs
+BEGIN
+    UPDATE ioc_daily_counts SET total = total - 1
+    WHERE ioc_type = 'ip'
+      AND source_id = COALESCE(OLD.source_id, 0)
+      AND day = COALESCE(date(OLD.first_seen), date('now'));
+    INSERT INTO ioc_daily_counts (ioc_type, source_id, day, total)
+    VALUES ('ip', COALESCE(NEW.source_id, 0), COALESCE(date(NEW.first_seen), date('now')), 1)
+    ON CONFLICT(ioc_type, source_id, day) DO UPDATE SET total = total + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS domain_iocs_count_insert AFTER INSERT ON domain_iocs
+BEGIN
+    UPDATE ioc_counters SET total = total + 1 WHERE ioc_type = 'domain';
+    INSERT INTO ioc_daily_counts (ioc_type, source_id, day, total)
+    VALUES ('domain', COALESCE(NEW.source_id, 0), COALESCE(date(NEW.first_seen), date('now')), 1)
+    ON CONFLICT(ioc_type, source_id, day) DO UPDATE SET total = total + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS domain_iocs_count_delete AFTER DELETE ON domain_iocs
+BEGIN
+    UPDATE ioc_counters SET total = total - 1 WHERE ioc_type = 'domain';
+    UPDATE ioc_daily_counts SET total = total - 1
+    WHERE ioc_type = 'domain'
+      AND source_id = COALESCE(OLD.source_id, 0)
+      AND day = COALESCE(date(OLD.first_seen), date('now'));
+END;
+
+CREATE TRIGGER IF NOT EXISTS domain_iocs_count_update AFTER UPDATE OF first_seen, source_id ON domain_iocs
+BEGIN
+    UPDATE ioc_daily_counts SET total = total - 1
+    WHERE ioc_type = 'domain'
+      AND source_id = COALESCE(OLD.source_id, 0)
+      AND day = COALESCE(date(OLD.first_seen), date('now'));
+    INSERT INTO ioc_daily_counts (ioc_type, source_id, day, total)
+    VALUES ('domain', COALESCE(NEW.source_id, 0), COALESCE(date(NEW.first_seen), date('now')), 1)
+    ON CONFLICT(ioc_type, source_id, day) DO UPDATE SET total = total + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS url_iocs_count_insert AFTER INSERT ON url_iocs
+BEGIN
+    UPDATE ioc_counters SET total = total + 1 WHERE ioc_type = 'url';
+    INSERT INTO ioc_daily_counts (ioc_type, source_id, day, total)
+    VALUES ('url', COALESCE(NEW.source_id, 0), COALESCE(date(NEW.first_seen), date('now')), 1)
+    ON CONFLICT(ioc_type, source_id, day) DO UPDATE SET total = total + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS url_iocs_count_delete AFTER DELETE ON url_iocs
+BEGIN
+    UPDATE ioc_counters SET total = total - 1 WHERE ioc_type = 'url';
+    UPDATE ioc_daily_counts SET total = total - 1
+    WHERE ioc_type = 'url'
+      AND source_id = COALESCE(OLD.source_id, 0)
+      AND day = COALESCE(date(OLD.first_seen), date('now'));
+END;
+
+CREATE TRIGGER IF NOT EXISTS url_iocs_count_update AFTER UPDATE OF first_seen, source_id ON url_iocs
+BEGIN
+    UPDATE ioc_daily_counts SET total = total - 1
+    WHERE ioc_type = 'url'
+      AND source_id = COALESCE(OLD.source_id, 0)
+      AND day = COALESCE(date(OLD.first_seen), date('now'));
+    INSERT INTO ioc_daily_counts (ioc_type, source_id, day, total)
+    VALUES ('url', COALESCE(NEW.source_id, 0), COALESCE(date(NEW.first_seen), date('now')), 1)
+    ON CONFLICT(ioc_type, source_id, day) DO UPDATE SET total = total + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS enrichment_results_count_insert AFTER INSERT ON enrichment_results
+BEGIN
+    UPDATE ioc_counters SET total = total + 1 WHERE ioc_type = 'enrichment';
+END;
+
+CREATE TRIGGER IF NOT EXISTS enrichment_results_count_delete AFTER DELETE ON enrichment_results
+BEGIN
+    UPDATE ioc_counters SET total = total - 1 WHERE ioc_type = 'enrichment';
+END;